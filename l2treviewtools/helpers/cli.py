@@ -18,29 +18,51 @@ class CLIHelper(object):
     super(CLIHelper, self).__init__()
     self.mock_responses = mock_responses
 
+  def _GetCommandArguments(self, command):
+    """Retrieves the arguments of a command.
+
+    Args:
+      command (str|list[str]): command to run, either as a string, that is
+          split into arguments according to shell-like syntax, or as a list
+          of arguments, that is passed as-is.
+
+    Returns:
+      tuple[str, list[str]]: command as a string and the arguments of
+          the command.
+    """
+    if isinstance(command, (list, tuple)):
+      arguments = list(command)
+      return u' '.join(arguments), arguments
+
+    return command, shlex.split(command)
+
   def RunCommand(self, command):
     """Runs a command.
 
+    The command is executed directly, not by means of a shell.
+
     Args:
-      command (str): command to run.
+      command (str|list[str]): command to run, either as a string, that is
+          split into arguments according to shell-like syntax, or as a list
+          of arguments, that is passed as-is.
 
     Returns:
       tuple[int, bytes, bytes]: exit code, stdout and stderr data.
     """
+    command, arguments = self._GetCommandArguments(command)
+
     if self.mock_responses:
       return_values = self.mock_responses.get(command, None)
       if not return_values:
         raise AttributeError(u'Unrecognized command.')
       return return_values
 
-    arguments = shlex.split(command)
-
     try:
       process = subprocess.Popen(
           arguments, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
     except OSError as exception:
       logging.error(
-          u'Running: "{0:s}" failed with error: {1:s}'.format(
+          u'Running: "{0:s}" failed with error: {1!s}'.format(
               command, exception))
       return 1, None, None
 
@@ -50,3 +72,49 @@ class CLIHelper(object):
           u'Running: "{0:s}" failed with error: {1!s}.'.format(command, error))
 
     return process.returncode, output, error
+
+  def RunCommandWithOutputCallback(self, command, output_callback):
+    """Runs a command and passes its output to a callback as it is produced.
+
+    The command is executed directly, not by means of a shell. Its stdout
+    and stderr are combined and passed to the callback line by line, which
+    prevents the output from having to be buffered.
+
+    Args:
+      command (str|list[str]): command to run, either as a string, that is
+          split into arguments according to shell-like syntax, or as a list
+          of arguments, that is passed as-is.
+      output_callback (function): function that is called with every line
+          of output, as bytes including the end-of-line character.
+
+    Returns:
+      int: exit code.
+    """
+    command, arguments = self._GetCommandArguments(command)
+
+    if self.mock_responses:
+      return_values = self.mock_responses.get(command, None)
+      if not return_values:
+        raise AttributeError(u'Unrecognized command.')
+
+      exit_code, output, _ = return_values
+      for line in (output or b'').splitlines(True):
+        output_callback(line)
+      return exit_code
+
+    try:
+      process = subprocess.Popen(
+          arguments, stderr=subprocess.STDOUT, stdout=subprocess.PIPE)
+    except OSError as exception:
+      logging.error(
+          u'Running: "{0:s}" failed with error: {1!s}'.format(
+              command, exception))
+      return 1
+
+    # Note that iter() with readline() is used since iterating the file
+    # object directly is buffered on Python 2.
+    for line in iter(process.stdout.readline, b''):
+      output_callback(line)
+
+    process.stdout.close()
+    return process.wait()
@@ -15,7 +15,10 @@ class GitHelper(cli.CLIHelper):
       git_repo_url (str): git repo URL.
     """
     super(GitHelper, self).__init__()
+    self._active_branch = None
+    self._email_address = None
     self._git_repo_url = git_repo_url
+    self._last_commit_message = None
     self._remotes = []
 
   def _GetRemotes(self):
@@ -96,15 +99,7 @@ class GitHelper(cli.CLIHelper):
     Returns:
       bool: True if the git repo has uncommitted changes.
     """
-    exit_code, output, _ = self.RunCommand(u'git status -s')
-    if exit_code != 0:
-      return False
-
-    # Check if 'git status -s' yielded any output.
-    for line in output.split(b'\n'):
-      if line:
-        return True
-    return False
+    return bool(self.GetPorcelainStatus())
 
   def CheckSynchronizedWithUpstream(self):
     """Checks if the git repo is synchronized with upstream.
@@ -143,6 +138,7 @@ class GitHelper(cli.CLIHelper):
         u'-m "Code review: {1:s}: {2:s}"').format(
             author, codereview_issue_number, description)
     exit_code, _, _ = self.RunCommand(command)
+    self._last_commit_message = None
     if exit_code != 0:
       return False
 
@@ -160,39 +156,51 @@ class GitHelper(cli.CLIHelper):
   def GetActiveBranch(self):
     """Retrieves the active branch.
 
+    The active branch is cached until the git helper switches branches.
+
     Returns:
       str: name of the active branch or None.
     """
-    exit_code, output, _ = self.RunCommand(u'git branch')
-    if exit_code != 0:
-      return False
+    if not self._active_branch:
+      exit_code, output, _ = self.RunCommand(u'git branch')
+      if exit_code != 0:
+        return False
 
-    # Check for remote entries starting with upstream.
-    for line in output.split(b'\n'):
-      if line.startswith(b'* '):
-        # Ignore the first 2 characters of the line.
-        return line[2:]
-    return
+      # Check for remote entries starting with upstream.
+      for line in output.split(b'\n'):
+        if line.startswith(b'* '):
+          # Ignore the first 2 characters of the line.
+          self._active_branch = line[2:]
+          break
+
+    return self._active_branch
 
-  def GetChangedFiles(self, diffbase=None):
+  def GetChangedFiles(self, diffbase=None, pathspec=None):
     """Retrieves the changed files.
 
     Args:
       diffbase (Optional[str]): git diffbase, for example "upstream/master".
+      pathspec (Optional[str]): git pathspec to limit the changed files to,
+          for example "*.py".
 
     Returns:
       list[str]: names of the changed files.
     """
     if diffbase:
-      command = u'git diff --name-only {0:s}'.format(diffbase)
+      command = [u'git', u'diff', u'--name-only', diffbase]
     else:
-      command = u'git ls-files'
+      command = [u'git', u'ls-files']
+
+    if pathspec:
+      command.extend([u'--', pathspec])
 
     exit_code, output, _ = self.RunCommand(command)
     if exit_code != 0:
       return []
 
-    return output.split(b'\n')
+    return [
+        filename for filename in output.decode(u'utf-8').split(u'\n')
+        if filename]
 
   def GetChangedPythonFiles(self, diffbase=None):
     """Retrieves the changed Python files.
@@ -211,9 +219,11 @@ class GitHelper(cli.CLIHelper):
     """
     upload_path = os.path.join(u'l2treviewtools', u'lib', u'upload.py')
     python_files = []
-    for changed_file in self.GetChangedFiles(diffbase=diffbase):
-      if (not changed_file.endswith(u'.py') or
-          changed_file.endswith(u'_pb2.py') or
+    # Note that git matches "*" in the pathspec against directory separators
+    # as well, hence it selects the Python files in all directories.
+    changed_files = self.GetChangedFiles(diffbase=diffbase, pathspec=u'*.py')
+    for changed_file in changed_files:
+      if (changed_file.endswith(u'_pb2.py') or
           not os.path.exists(changed_file) or
           changed_file.startswith(u'data') or
           changed_file.startswith(u'docs') or
@@ -231,33 +241,72 @@ class GitHelper(cli.CLIHelper):
     Returns:
       str: email address or None.
     """
-    exit_code, output, _ = self.RunCommand(u'git config user.email')
-    if exit_code != 0:
-      return
+    if not self._email_address:
+      exit_code, output, _ = self.RunCommand(u'git config user.email')
+      if exit_code != 0:
+        return
 
-    output_lines = output.split(b'\n')
-    if not output_lines:
-      return
+      output_lines = output.split(b'\n')
+      if not output_lines:
+        return
 
-    return output_lines[0]
+      self._email_address = output_lines[0]
+
+    return self._email_address
 
   def GetLastCommitMessage(self):
     """Retrieves the last commit message.
 
+    The last commit message is cached until the git helper changes
+    the commits.
+
     Returns:
       str: last commit message or None.
     """
-    exit_code, output, _ = self.RunCommand(u'git log -1')
+    if not self._last_commit_message:
+      exit_code, output, _ = self.RunCommand(u'git log -1')
+      if exit_code != 0:
+        return
+
+      # Expecting 6 lines of output where the 5th line contains
+      # the commit message.
+      output_lines = output.split(b'\n')
+      if len(output_lines) != 6:
+        return
+
+      self._last_commit_message = output_lines[4].strip()
+
+    return self._last_commit_message
+
+  def GetPorcelainStatus(self):
+    """Retrieves the status of the changed files in porcelain format.
+
+    Returns:
+      list[tuple[bytes, bytes]]: status and path of the changed files, where
+          the status consists of 2 characters that represent the status of
+          the index and the working tree, for example b' M' or b'??'.
+    """
+    exit_code, output, _ = self.RunCommand(u'git status --porcelain -z')
     if exit_code != 0:
-      return
+      return []
 
-    # Expecting 6 lines of output where the 5th line contains
-    # the commit message.
-    output_lines = output.split(b'\n')
-    if len(output_lines) != 6:
-      return
+    changed_files = []
+
+    # Every entry is terminated by a NUL character and is formatted as:
+    # "XY PATH", where renamed and copied entries are followed by an entry
+    # with the original path.
+    entries = iter(output.split(b'\0'))
+    for entry in entries:
+      if not entry:
+        continue
+
+      status = entry[:2]
+      changed_files.append((status, entry[3:]))
+
+      if status[:1] in (b'C', b'R'):
+        next(entries, None)
 
-    return output_lines[4].strip()
+    return changed_files
 
   def GetRemoteOrigin(self):
     """Retrieves the remote origin.
@@ -284,6 +333,7 @@ class GitHelper(cli.CLIHelper):
     """
     command = u'git pull --squash {0:s} {1:s}'.format(git_repo_url, branch)
     exit_code, _, _ = self.RunCommand(command)
+    self._last_commit_message = None
     return exit_code == 0
 
   def PushToOrigin(self, branch, force=False):
@@ -327,6 +377,7 @@ class GitHelper(cli.CLIHelper):
       return False
 
     exit_code, _, _ = self.RunCommand(u'git pull --no-edit origin master')
+    self._last_commit_message = None
 
     return exit_code == 0
 
@@ -342,6 +393,7 @@ class GitHelper(cli.CLIHelper):
 
     exit_code, _, _ = self.RunCommand(
         u'git pull --no-edit --rebase upstream master')
+    self._last_commit_message = None
     if exit_code != 0:
       return False
 
@@ -356,4 +408,6 @@ class GitHelper(cli.CLIHelper):
       bool: True if the git repository has switched to the master branch.
     """
     exit_code, _, _ = self.RunCommand(u'git checkout master')
+    self._active_branch = None
+    self._last_commit_message = None
     return exit_code == 0
@@ -11,17 +11,35 @@ from l2treviewtools.lib import errors
 class GitHubHelper(object):
   """Github helper."""
 
-  def __init__(self, organization, project):
+  _FORK_GIT_REPO_URL = u'https://github.com/{0:s}/{1:s}.git'
+
+  _PULL_REQUEST_BODY = (
+      u'[Code review: {0!s}: {1:s}](https://codereview.appspot.com/{0!s}/)')
+
+  _PULL_REQUEST_TITLE = u'{0!s}: {1:s}'
+
+  _PULLS_URL = u'https://api.github.com/repos/{0:s}/{1:s}/pulls'
+
+  _USERS_URL = u'https://api.github.com/users/{0:s}'
+
+  def __init__(
+      self, organization, project, response_cache=None, url_lib_helper=None):
     """Initializes a github helper.
 
     Args:
       organization (str): github organization name.
       project (str): github project name.
+      response_cache (Optional[ResponseCache]): cache of github API
+          responses, which is used to make conditional requests.
+      url_lib_helper (Optional[URLLibHelper]): URL library helper, which
+          can be shared with other helpers to reuse its connections.
     """
     super(GitHubHelper, self).__init__()
+    self._fork_git_repo_urls = {}
     self._organization = organization
     self._project = project
-    self._url_lib_helper = url_lib.URLLibHelper()
+    self._response_cache = response_cache
+    self._url_lib_helper = url_lib_helper or url_lib.URLLibHelper()
 
   def CreatePullRequest(
       self, access_token, codereview_issue_number, origin, description):
@@ -37,27 +55,29 @@ class GitHubHelper(object):
     Returns:
       bool: True if the pull request was created.
     """
-    title = u'{0!s}: {1:s}'.format(codereview_issue_number, description)
-    body = (
-        u'[Code review: {0!s}: {1:s}]'
-        u'(https://codereview.appspot.com/{0!s}/)').format(
-            codereview_issue_number, description)
-
-    post_data = (
-        u'{{\n'
-        u'  "title": "{0:s}",\n'
-        u'  "body": "{1:s}",\n'
-        u'  "head": "{2:s}",\n'
-        u'  "base": "master"\n'
-        u'}}\n').format(title, body, origin)
-
-    github_url = (
-        u'https://api.github.com/repos/{0:s}/{1:s}/pulls?'
-        u'access_token={2:s}').format(
-            self._organization, self._project, access_token)
+    title = self._PULL_REQUEST_TITLE.format(
+        codereview_issue_number, description)
+    body = self._PULL_REQUEST_BODY.format(codereview_issue_number, description)
+
+    post_data = json.dumps({
+        u'title': title,
+        u'body': body,
+        u'head': origin,
+        u'base': u'master'})
+    post_data = post_data.encode(u'utf-8')
+
+    github_url = self._PULLS_URL.format(self._organization, self._project)
+
+    # Pass the access token in a header to prevent it from ending up in
+    # (server) logs as part of the URL.
+    headers = {
+        u'Authorization': u'token {0:s}'.format(access_token),
+        u'Content-Type': u'application/json'}
 
     try:
-      self._url_lib_helper.Request(github_url, post_data=post_data)
+      # Only the status of the response is relevant.
+      self._url_lib_helper.Request(
+          github_url, post_data=post_data, headers=headers, read_data=False)
 
     except errors.ConnectionError as exception:
       logging.warning(u'{0!s}'.format(exception))
@@ -74,25 +94,50 @@ class GitHubHelper(object):
     Returns:
       str: git repository URL or None.
     """
-    return u'https://github.com/{0:s}/{1:s}.git'.format(username, self._project)
+    fork_git_repo_url = self._fork_git_repo_urls.get(username, None)
+    if not fork_git_repo_url:
+      fork_git_repo_url = self._FORK_GIT_REPO_URL.format(
+          username, self._project)
+      self._fork_git_repo_urls[username] = fork_git_repo_url
+
+    return fork_git_repo_url
 
   def QueryUser(self, username):
     """Queries a github user.
 
+    If a response cache is available the query is made conditional on the
+    cached response having changed. Conditional requests that are answered
+    with "304 Not Modified" do not count against the github rate limit.
+
     Args:
       username (str): github user name.
 
     Returns:
       dict[str,object]: JSON response or None.
     """
-    github_url = u'https://api.github.com/users/{0:s}'.format(username)
+    github_url = self._USERS_URL.format(username)
+
+    cached_response = None
+    if self._response_cache:
+      cached_response = self._response_cache.GetResponse(github_url)
+
+    etag = None
+    if cached_response:
+      etag = cached_response[0]
 
     try:
-      response_data = self._url_lib_helper.Request(github_url)
+      etag, response_data = self._url_lib_helper.RequestIfModified(
+          github_url, etag=etag)
 
     except errors.ConnectionError as exception:
       logging.warning(u'{0!s}'.format(exception))
       return
 
+    if response_data is None:
+      response_data = cached_response[1]
+
+    elif self._response_cache and etag and response_data:
+      self._response_cache.SetResponse(github_url, etag, response_data)
+
     if response_data:
-      return json.loads(response_data)
+      return json.loads(response_data.decode(u'utf-8'))
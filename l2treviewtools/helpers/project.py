@@ -33,6 +33,13 @@ class ProjectHelper(cli.CLIHelper):
       u'dftimewolf', u'eccemotus', u'l2tdevtools', u'l2tdocs', u'l2tpreg',
       u'l2treviewtools', u'plaso'])
 
+  # The supported project names sorted longest first, so that a project name
+  # is matched before any shorter project name it contains. Project names of
+  # the same length are sorted alphabetically, so that the order does not
+  # depend on the order of the set.
+  SUPPORTED_PROJECTS_LONGEST_FIRST = tuple(sorted(
+      SUPPORTED_PROJECTS, key=lambda name: (-len(name), name)))
+
   def __init__(self, script_path):
     """Initializes a project helper.
 
@@ -67,7 +74,12 @@ class ProjectHelper(cli.CLIHelper):
     project_name = os.path.dirname(project_name)
     project_name = os.path.basename(project_name)
 
-    for supported_project_name in self.SUPPORTED_PROJECTS:
+    if project_name in self.SUPPORTED_PROJECTS:
+      return project_name
+
+    # The project directory name can contain more than the project name,
+    # for example "plaso-master".
+    for supported_project_name in self.SUPPORTED_PROJECTS_LONGEST_FIRST:
       if supported_project_name in project_name:
         return supported_project_name
 
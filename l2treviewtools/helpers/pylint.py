@@ -1,17 +1,144 @@
 # -*- coding: utf-8 -*-
 """Helper for interacting with pylint."""
+from __future__ import absolute_import
 from __future__ import print_function
-import subprocess
+import multiprocessing
+import re
 
 from l2treviewtools.helpers import cli
 
 
+class _OutputWriter(object):
+  """Writer that passes the pylint output to a callback per line."""
+
+  def __init__(self, output_callback):
+    """Initializes an output writer.
+
+    Args:
+      output_callback (function): function that is called with every line
+          of output, as a byte string including the end-of-line character.
+    """
+    super(_OutputWriter, self).__init__()
+    self._buffer = u''
+    self._output_callback = output_callback
+
+  def flush(self):
+    """Flushes the remaining output."""
+    if self._buffer:
+      self._output_callback(self._buffer.encode(u'utf-8'))
+      self._buffer = u''
+
+  def write(self, text):
+    """Writes output.
+
+    Args:
+      text (str): output.
+    """
+    if isinstance(text, bytes):
+      text = text.decode(u'utf-8')
+
+    lines = u''.join([self._buffer, text]).split(u'\n')
+    self._buffer = lines.pop()
+    for line in lines:
+      self._output_callback(u'{0:s}\n'.format(line).encode(u'utf-8'))
+
+
 class PylintHelper(cli.CLIHelper):
   """Pylint helper."""
 
   MINIMUM_VERSION = u'1.6.5'
 
-  _MINIMUM_VERSION_TUPLE = MINIMUM_VERSION.split(u'.')
+  _MINIMUM_VERSION_TUPLE = tuple([
+      int(digit) for digit in MINIMUM_VERSION.split(u'.')])
+
+  # Template of the pylint messages, where every message starts with the path
+  # of the file it relates to.
+  _MESSAGE_TEMPLATE = u'{path}:{line}: [{msg_id}({symbol}), {obj}] {msg}'
+
+  _PYLINT_ARGUMENTS = (
+      u'pylint', u'--rcfile=utils/pylintrc', u'--reports=n',
+      u'--msg-template={0:s}'.format(_MESSAGE_TEMPLATE))
+
+  _VERSION_RE = re.compile(
+      br'^pylint ([0-9]+)\.([0-9]+)\.([0-9]+)', re.MULTILINE)
+
+  _version_tuple = None
+
+  def __init__(self, mock_responses=None):
+    """Initializes a pylint helper.
+
+    Args:
+      mock_responses(Optional[dict[str, str]): dict mapping commands to
+          responses, used for testing.
+    """
+    super(PylintHelper, self).__init__(mock_responses=mock_responses)
+    self._filenames_with_messages = set()
+
+  def _PrintOutputLine(self, line):
+    """Prints a line of pylint output and tracks the files with messages.
+
+    Args:
+      line (bytes): line of pylint output.
+    """
+    line = line.decode(u'utf-8').rstrip()
+    print(line)
+
+    path, _, _ = line.partition(u':')
+    self._filenames_with_messages.add(path)
+
+  def _RunPylintInProcess(self, arguments):
+    """Runs pylint in the current process.
+
+    Args:
+      arguments (list[str]): pylint arguments, without the name of
+          the executable.
+
+    Returns:
+      int: pylint message status, which is 0 if there were no messages,
+          or the exit code of pylint if it exited due to an error.
+    """
+    # pylint is imported when needed, since importing it is slow and most
+    # commands do not lint.
+    from pylint import lint as pylint_lint
+    from pylint.reporters import text as pylint_text_reporter
+
+    output_writer = _OutputWriter(self._PrintOutputLine)
+    reporter = pylint_text_reporter.TextReporter(output=output_writer)
+    try:
+      run = pylint_lint.Run(arguments, reporter=reporter, exit=False)
+
+    # pylint exits on usage and configuration errors, for example a missing
+    # rcfile, regardless of exit being False.
+    except SystemExit as exception:
+      exit_code = exception.code
+      if exit_code is None:
+        return 0
+      if not isinstance(exit_code, int):
+        return 1
+      return exit_code
+
+    finally:
+      output_writer.flush()
+
+    return run.linter.msg_status
+
+  def _UseInProcessPylint(self):
+    """Determines if pylint can be run in the current process.
+
+    Returns:
+      bool: True if pylint can be imported, is up to date and the helper
+          is not used for testing.
+    """
+    if self.mock_responses:
+      return False
+
+    try:
+      from pylint import __pkginfo__ as pylint_pkginfo
+    except ImportError:
+      return False
+
+    version_tuple = tuple(pylint_pkginfo.numversion[:3])
+    return version_tuple >= self._MINIMUM_VERSION_TUPLE
 
   def CheckFiles(self, filenames):
     """Checks if the linting of the files is correct using pylint.
@@ -23,22 +150,45 @@ class PylintHelper(cli.CLIHelper):
       bool: True if the files were linted without errors.
     """
     print(u'Running linter on changed files.')
-    failed_filenames = []
-    for filename in filenames:
-      print(u'Checking: {0:s}'.format(filename))
-
-      command = u'pylint --rcfile=utils/pylintrc {0:s}'.format(filename)
-      exit_code = subprocess.call(command, shell=True)
-      if exit_code != 0:
-        failed_filenames.append(filename)
-
-    if failed_filenames:
-      print(u'\nFiles with linter errors:')
-      for failed_filename in filenames:
-        print(u'\t{0:s}'.format(failed_filename))
-      return False
-
-    return True
+    if not filenames:
+      return True
+
+    # pylint is invoked once for all the files, which prevents pylint and its
+    # plugins from being loaded for every file, and lints the files in
+    # parallel.
+    command = list(self._PYLINT_ARGUMENTS)
+    command.append(u'--jobs={0:d}'.format(multiprocessing.cpu_count()))
+    command.extend(filenames)
+
+    # The pylint output is printed as it is produced, instead of after
+    # pylint has completed.
+    self._filenames_with_messages = set()
+
+    # If pylint can be imported it is run in the current process, which
+    # prevents the start up of a separate Python interpreter.
+    if self._UseInProcessPylint():
+      exit_code = self._RunPylintInProcess(command[1:])
+    else:
+      exit_code = self.RunCommandWithOutputCallback(
+          command, self._PrintOutputLine)
+    if exit_code == 0:
+      return True
+
+    failed_filenames = [
+        filename for filename in filenames
+        if filename in self._filenames_with_messages]
+
+    # If pylint failed without reporting messages, for example due to
+    # a usage error, all the files are considered to have failed.
+    if not failed_filenames:
+      failed_filenames = filenames
+
+    # The names of the failed files are printed with a single call, instead
+    # of formatting and printing every name separately.
+    print(u'\nFiles with linter errors:\n\t{0:s}'.format(
+        u'\n\t'.join(failed_filenames)))
+
+    return False
 
   def CheckUpToDateVersion(self):
     """Checks if the pylint version is up to date.
@@ -46,17 +196,18 @@ class PylintHelper(cli.CLIHelper):
     Returns:
       bool: True if the pylint version is up to date.
     """
-    exit_code, output, _ = self.RunCommand(u'pylint --version')
-    if exit_code != 0:
-      return False
+    # The version is cached at class level so that pylint only needs to be
+    # run once per process.
+    if PylintHelper._version_tuple is None:
+      exit_code, output, _ = self.RunCommand(u'pylint --version')
+      if exit_code != 0:
+        return False
 
-    version_tuple = (0, 0, 0)
-    for line in output.split(b'\n'):
-      if line.startswith(b'pylint '):
-        _, _, version = line.partition(b' ')
-        # Remove a trailing comma.
-        version, _, _ = version.partition(b',')
+      version_tuple = (0, 0, 0)
+      match = self._VERSION_RE.search(output)
+      if match:
+        version_tuple = tuple([int(digit) for digit in match.groups()])
 
-        version_tuple = tuple([int(digit) for digit in version.split(b'.')])
+      PylintHelper._version_tuple = version_tuple
 
-    return version_tuple >= self._MINIMUM_VERSION_TUPLE
+    return PylintHelper._version_tuple >= self._MINIMUM_VERSION_TUPLE
@@ -2,6 +2,7 @@
 """Helper for interacting with readthedocs."""
 
 import logging
+import time
 
 from l2treviewtools.helpers import url_lib
 from l2treviewtools.lib import errors
@@ -10,30 +11,52 @@ from l2treviewtools.lib import errors
 class ReadTheDocsHelper(object):
   """Readthedocs helper."""
 
-  def __init__(self, project):
+  # Number of seconds after a build was triggered during which another
+  # trigger of the build of the same project is ignored.
+  _TRIGGER_BUILD_INTERVAL = 30.0
+
+  # POSIX timestamps of the last triggered builds per project.
+  _last_trigger_build_times = {}
+
+  def __init__(self, project, url_lib_helper=None):
     """Initializes a readthedocs helper.
 
     Args:
       project (str): github project name.
+      url_lib_helper (Optional[URLLibHelper]): URL library helper, which
+          can be shared with other helpers to reuse its connections.
     """
     super(ReadTheDocsHelper, self).__init__()
     self._project = project
-    self._url_lib_helper = url_lib.URLLibHelper()
+    self._url_lib_helper = url_lib_helper or url_lib.URLLibHelper()
 
   def TriggerBuild(self):
     """Triggers readthedocs to build the docs of the project.
 
+    Repeated triggers of the build of the same project, within a short
+    interval, are ignored since readthedocs already builds the docs.
+
     Returns:
       bool: True if the build was triggered.
     """
+    current_time = time.time()
+    last_trigger_build_time = self._last_trigger_build_times.get(
+        self._project, None)
+    if (last_trigger_build_time is not None and
+        current_time - last_trigger_build_time < self._TRIGGER_BUILD_INTERVAL):
+      return True
+
     readthedocs_url = u'https://readthedocs.org/build/{0:s}'.format(
         self._project)
 
     try:
-      self._url_lib_helper.Request(readthedocs_url, post_data=b'')
+      self._url_lib_helper.Request(
+          readthedocs_url, post_data=b'', read_data=False)
 
     except errors.ConnectionError as exception:
       logging.warning(u'{0!s}'.format(exception))
       return False
 
+    self._last_trigger_build_times[self._project] = current_time
+
     return True
@@ -3,10 +3,14 @@
 
 from __future__ import print_function
 
+import logging
 import os
-import re
+import sqlite3
 import subprocess
 import sys
+import threading
+
+from multiprocessing import pool as multiprocessing_pool
 
 from l2treviewtools.helpers import git
 from l2treviewtools.helpers import github
@@ -15,20 +19,40 @@ from l2treviewtools.helpers import pylint
 from l2treviewtools.helpers import readthedocs
 from l2treviewtools.helpers import sphinxapi
 from l2treviewtools.helpers import upload
+from l2treviewtools.helpers import url_lib
 from l2treviewtools.lib import netrcfile
-from l2treviewtools.lib import reviewfile
+from l2treviewtools.lib import responsecache
+from l2treviewtools.lib import reviewindex
 
 
 class ReviewHelper(object):
   """Defines review helper functions."""
 
-  _PROJECT_NAME_PREFIX_REGEX = re.compile(
-      r'\[({0:s})\] '.format(
-          u'|'.join(project.ProjectHelper.SUPPORTED_PROJECTS)))
+  # Commands for which the changes are linted.
+  _LINT_COMMANDS = frozenset([
+      u'create', u'merge', u'lint', u'lint-test', u'lint_test', u'update'])
+
+  # The project name prefixes are sorted longest first, so that a prefix
+  # is matched before any shorter prefix it starts with.
+  _PROJECT_NAME_PREFIXES = tuple([
+      u'[{0:s}] '.format(project_name) for project_name in (
+          project.ProjectHelper.SUPPORTED_PROJECTS_LONGEST_FIRST)])
+
+  # Projects that do not contain code and hence are not linted, tested
+  # or versioned.
+  _SKIP_PROJECTS = frozenset([u'l2tdocs'])
+
+  # Commands for which the tests are run.
+  _TEST_COMMANDS = frozenset([
+      u'create', u'lint-test', u'lint_test', u'merge', u'test', u'update'])
+
+  # Project helpers per script path.
+  _project_helpers = {}
 
   def __init__(
       self, command, github_origin, feature_branch, diffbase, all_files=False,
-      no_browser=False, no_confirm=False):  # yapf: disable
+      isolate=False, netrc_file=None, no_browser=False,
+      no_confirm=False):  # yapf: disable
     """Initializes a review helper.
 
     Args:
@@ -38,6 +62,10 @@ class ReviewHelper(object):
       diffbase (str): diffbase.
       all_files (Optional[bool]): True if the command should apply to all
           files. Currently this only affects the lint command.
+      isolate (Optional[bool]): True if the codereview upload.py tool should
+          be run in a separate process.
+      netrc_file (Optional[NetRCFile]): .netrc file, where None represents
+          the .netrc file should be read when needed.
       no_browser (Optional[bool]): True if the functionality to use the
           webbrowser to get the OAuth token should be disabled.
       no_confirm (Optional[bool]): True if the defaults should be applied
@@ -47,6 +75,7 @@ class ReviewHelper(object):
     self._active_branch = None
     self._all_files = all_files
     self._codereview_helper = None
+    self._codereview_information_result = None
     self._command = command
     self._diffbase = diffbase
     self._feature_branch = feature_branch
@@ -54,20 +83,96 @@ class ReviewHelper(object):
     self._git_repo_url = None
     self._github_helper = None
     self._github_origin = github_origin
+    self._github_user_result = None
+    self._has_apidoc = False
+    self._isolate = isolate
     self._fork_feature_branch = None
     self._fork_username = None
     self._merge_author = None
     self._merge_description = None
+    self._netrc_file = netrc_file
     self._no_browser = no_browser
     self._no_confirm = no_confirm
     self._project_helper = None
     self._project_name = None
+    self._response_cache = None
     self._sphinxapidoc_helper = None
+    self._upstream_fetch_thread = None
+    self._url_lib_helper = None
 
     if self._github_origin:
       self._fork_username, _, self._fork_feature_branch = (
           self._github_origin.partition(u':'))
 
+  def _ReadDescription(self, description_type, default_description):
+    """Reads a description from the user.
+
+    The user is not asked for a description when no confirmation is needed
+    or when stdin is not interactive, for example in an automated workflow.
+
+    Args:
+      description_type (str): type of the description, for example
+          "code review".
+      default_description (str): description to use if the user does not
+          provide one.
+
+    Returns:
+      str: description.
+    """
+    print(u'Automatic generated description of the {0:s}:'.format(
+        description_type))
+    print(default_description)
+    print(u'')
+
+    if self._no_confirm or not sys.stdin.isatty():
+      return default_description
+
+    print(u'Enter a description for the {0:s} or hit enter to use the'.format(
+        description_type))
+    print(u'automatic generated one:')
+    user_input = sys.stdin.readline()
+    user_input = user_input.strip()
+
+    return user_input or default_description
+
+  def _RunConcurrently(self, functions):
+    """Runs functions concurrently.
+
+    Args:
+      functions (list[function]): functions, without arguments, to run.
+
+    Returns:
+      list[object]: return values of the functions, in the same order as
+          the functions.
+    """
+    thread_pool = multiprocessing_pool.ThreadPool(processes=len(functions))
+    try:
+      async_results = [
+          thread_pool.apply_async(function) for function in functions]
+      return [async_result.get() for async_result in async_results]
+
+    finally:
+      thread_pool.close()
+      thread_pool.join()
+
+  def _UpdateVersionFiles(self):
+    """Updates the version file and the dpkg changelog file.
+
+    Returns:
+      bool: True if the version files were updated.
+    """
+    if not self._project_helper.UpdateVersionFile():
+      print(u'Unable to update version file.')
+      return False
+
+    # Note that the dpkg changelog file contains the version from the version
+    # file, hence it needs to be updated after the version file.
+    if not self._project_helper.UpdateDpkgChangelogFile():
+      print(u'Unable to update dpkg changelog file.')
+      return False
+
+    return True
+
   # yapf: disable
   def CheckLocalGitState(self):
     """Checks the state of the local git repository.
@@ -151,7 +256,13 @@ class ReviewHelper(object):
         return False
 
     elif self._command in (u'lint', u'lint-test', u'lint_test'):
-      self._git_helper.CheckSynchronizedWithUpstream()
+      # Linting only depends on the upstream being fetched for the diffbase,
+      # hence the fetch runs in the background and Lint waits for it to
+      # complete before determining the changed files.
+      self._upstream_fetch_thread = threading.Thread(
+          target=self._git_helper.CheckSynchronizedWithUpstream)
+      self._upstream_fetch_thread.daemon = True
+      self._upstream_fetch_thread.start()
 
     elif self._command == u'merge':
       if not self._git_helper.SynchronizeWithOrigin():
@@ -174,15 +285,16 @@ class ReviewHelper(object):
     else:
       self._git_helper.RemoveFeatureBranch(self._feature_branch)
 
-    review_file = reviewfile.ReviewFile(self._feature_branch)
-    if not review_file.Exists():
+    review_index = reviewindex.ReviewIndex()
+    if not review_index.HasBranch(self._feature_branch):
       print(u'Review file missing for branch: {0:s}'.format(
           self._feature_branch))  # yapf: disable
 
     else:
-      codereview_issue_number = review_file.GetCodeReviewIssueNumber()
+      codereview_issue_number = review_index.GetCodeReviewIssueNumber(
+          self._feature_branch)
 
-      review_file.Remove()
+      review_index.RemoveBranch(self._feature_branch)
 
       if codereview_issue_number:
         if not self._codereview_helper.CloseIssue(codereview_issue_number):
@@ -201,8 +313,8 @@ class ReviewHelper(object):
       bool: True if the create was successful.
     """
     # yapf: disable
-    review_file = reviewfile.ReviewFile(self._active_branch)
-    if review_file.Exists():
+    review_index = reviewindex.ReviewIndex()
+    if review_index.HasBranch(self._active_branch):
       print(u'Review file already exists for branch: {0:s}'.format(
           self._active_branch))
       return False
@@ -216,8 +328,10 @@ class ReviewHelper(object):
 
     git_origin, _, _ = git_origin[len(u'https://github.com/'):].rpartition(u'/')
 
-    netrc_file = netrcfile.NetRCFile()
-    github_access_token = netrc_file.GetGitHubAccessToken()
+    if not self._netrc_file:
+      self._netrc_file = netrcfile.NetRCFile()
+
+    github_access_token = self._netrc_file.GetGitHubAccessToken()
     if not github_access_token:
       print(u'{0:s} aborted - unable to determine github access token.'.format(
           self._command.title()))
@@ -225,22 +339,7 @@ class ReviewHelper(object):
       return False
 
     last_commit_message = self._git_helper.GetLastCommitMessage()
-    print(u'Automatic generated description of code review:')
-    print(last_commit_message)
-    print(u'')
-
-    if self._no_confirm:
-      user_input = None
-    else:
-      print(u'Enter a description for the code review or hit enter to use the')
-      print(u'automatic generated one:')
-      user_input = sys.stdin.readline()
-      user_input = user_input.strip()
-
-    if not user_input:
-      description = last_commit_message
-    else:
-      description = user_input
+    description = self._ReadDescription(u'code review', last_commit_message)
 
     # Prefix the description with the project name for code review to make it
     # easier to distinguish between projects.
@@ -254,10 +353,8 @@ class ReviewHelper(object):
           self._command.title()))
       return False
 
-    if not os.path.isdir(u'.review'):
-      os.mkdir(u'.review')
-
-    review_file.Create(codereview_issue_number)
+    review_index.SetCodeReviewIssueNumber(
+        self._active_branch, codereview_issue_number)
 
     create_github_origin = u'{0:s}:{1:s}'.format(
         git_origin, self._active_branch)
@@ -277,7 +374,12 @@ class ReviewHelper(object):
     """
     script_path = os.path.abspath(__file__)
 
-    self._project_helper = project.ProjectHelper(script_path)
+    # The project helper only depends on the script path, hence it is shared
+    # by all review helpers in the same process.
+    self._project_helper = self._project_helpers.get(script_path, None)
+    if not self._project_helper:
+      self._project_helper = project.ProjectHelper(script_path)
+      self._project_helpers[script_path] = self._project_helper
 
     self._project_name = self._project_helper.project_name
     if not self._project_name:
@@ -285,20 +387,47 @@ class ReviewHelper(object):
           self._command.title()))  # yapf: disable
       return False
 
-    self._git_repo_url = b'https://github.com/log2timeline/{0:s}.git'.format(
+    self._git_repo_url = u'https://github.com/log2timeline/{0:s}.git'.format(
         self._project_name)
 
     self._git_helper = git.GitHelper(self._git_repo_url)
 
+    # The URL library helper is shared by the helpers that interact with
+    # web services, so that connections are reused.
+    self._url_lib_helper = url_lib.URLLibHelper()
+
+    # The response cache is only opened for the commands that query github
+    # or codereview, so that for example linting does not create it.
+    if self._command in (u'close', u'create', u'merge', u'update'):
+      cache_path = os.path.join(
+          os.path.expanduser(u'~'), u'.cache', u'l2treviewtools',
+          u'responses.db')
+      try:
+        self._response_cache = responsecache.ResponseCache(cache_path)
+      except (OSError, sqlite3.Error) as exception:
+        # The response cache is an optimization, hence continue without it.
+        logging.warning(
+            u'Unable to open response cache with error: {0!s}'.format(
+                exception))
+
     self._github_helper = github.GitHubHelper(
-        u'log2timeline', self._project_name)
+        u'log2timeline', self._project_name,
+        response_cache=self._response_cache,
+        url_lib_helper=self._url_lib_helper)
 
     if self._command in (u'close', u'create', u'merge', u'update'):
       email_address = self._git_helper.GetEmailAddress()
       self._codereview_helper = upload.UploadHelper(
-          email_address, no_browser=self._no_browser)
+          email_address, isolate=self._isolate, no_browser=self._no_browser,
+          response_cache=self._response_cache,
+          url_lib_helper=self._url_lib_helper)
 
     if self._command == u'merge':
+      # Only projects that have a sphinx configuration have API docs, which
+      # is determined once for the project.
+      apidoc_config_path = os.path.join(u'docs', u'conf.py')
+      self._has_apidoc = os.path.exists(apidoc_config_path)
+
       self._sphinxapidoc_helper = sphinxapi.SphinxAPIDocHelper(
           self._project_name)
       # TODO: disable the version check for now since sphinx-apidoc 1.2.2
@@ -319,11 +448,10 @@ class ReviewHelper(object):
     Returns:
       bool: True if linting was successful.
     """
-    if self._project_name == u'l2tdocs':
+    if self._project_name in self._SKIP_PROJECTS:
       return True
 
-    if self._command not in (
-        u'create', u'merge', u'lint', u'lint-test', u'lint_test', u'update'):
+    if self._command not in self._LINT_COMMANDS:
       return True
 
     pylint_helper = pylint.PylintHelper()
@@ -332,6 +460,10 @@ class ReviewHelper(object):
           self._command.title(), pylint.PylintHelper.MINIMUM_VERSION))
       return False
 
+    if self._upstream_fetch_thread:
+      self._upstream_fetch_thread.join()
+      self._upstream_fetch_thread = None
+
     if self._all_files:
       diffbase = None
     elif self._command == u'merge':
@@ -362,34 +494,37 @@ class ReviewHelper(object):
     Returns:
       bool: True if the merge was successful.
     """
-    if not self._project_helper.UpdateVersionFile():
-      print(u'Unable to update version file.')
+    functions = [self._UpdateVersionFiles]
+    if self._has_apidoc:
+      functions.append(self._sphinxapidoc_helper.UpdateAPIDocs)
+
+    # Updating the version files and updating the API docs do not depend on
+    # each other, hence they are run concurrently.
+    results = self._RunConcurrently(functions)
+    if not results[0]:
       self._git_helper.DropUncommittedChanges()
       return False
 
-    if not self._project_helper.UpdateDpkgChangelogFile():
-      print(u'Unable to update dpkg changelog file.')
+    if self._has_apidoc:
+      self._git_helper.AddPath(u'docs')
+
+    if not self._git_helper.CommitToOriginInNameOf(
+        codereview_issue_number, self._merge_author, self._merge_description):
+      print(u'Unable to commit changes.')
       self._git_helper.DropUncommittedChanges()
       return False
 
-    apidoc_config_path = os.path.join(u'docs', u'conf.py')
-    if os.path.exists(apidoc_config_path):
-      self._sphinxapidoc_helper.UpdateAPIDocs()
-      self._git_helper.AddPath(u'docs')
-
-      readthedocs_helper = readthedocs.ReadTheDocsHelper(self._project_name)
+    # readthedocs is only triggered when all the changes were made and
+    # committed, so that an aborted merge does not trigger a build.
+    if self._has_apidoc and all(results):
+      readthedocs_helper = readthedocs.ReadTheDocsHelper(
+          self._project_name, url_lib_helper=self._url_lib_helper)
 
       # The project wiki repo contains the documentation and
       # has no trigger on update webhook for readthedocs.
       # So we trigger readthedocs directly to build the docs.
       readthedocs_helper.TriggerBuild()
 
-    if not self._git_helper.CommitToOriginInNameOf(
-        codereview_issue_number, self._merge_author, self._merge_description):
-      print(u'Unable to commit changes.')
-      self._git_helper.DropUncommittedChanges()
-      return False
-
     commit_message = (
         u'Changes have been merged with master branch. '
         u'To close the review and clean up the feature branch you can run: '
@@ -419,6 +554,29 @@ class ReviewHelper(object):
 
     return False
 
+  def PrefetchMergeInformation(self, codereview_issue_number):
+    """Starts retrieving the information needed to prepare a merge.
+
+    The code review and github user information do not depend on each other
+    or on the state of the git repository, hence they are retrieved in
+    the background, while for example the git repository is synchronized.
+    Note that the thread pool is closed right away, so that its workers
+    finish after the queries, and the queries are not waited for when
+    the merge is aborted.
+
+    Args:
+      codereview_issue_number (int|str): codereview issue number.
+    """
+    if self._codereview_information_result:
+      return
+
+    thread_pool = multiprocessing_pool.ThreadPool(processes=2)
+    self._codereview_information_result = thread_pool.apply_async(
+        self._codereview_helper.QueryIssue, (codereview_issue_number, ))
+    self._github_user_result = thread_pool.apply_async(
+        self._github_helper.QueryUser, (self._fork_username, ))
+    thread_pool.close()
+
   def PrepareMerge(self, codereview_issue_number):
     """Prepares a merge.
 
@@ -428,8 +586,9 @@ class ReviewHelper(object):
     Returns:
       bool: True if the prepare were successful.
     """
-    codereview_information = self._codereview_helper.QueryIssue(
-        codereview_issue_number)
+    self.PrefetchMergeInformation(codereview_issue_number)
+
+    codereview_information = self._codereview_information_result.get()
     if not codereview_information:
       print((
           u'{0:s} aborted - unable to retrieve code review: {1!s} '
@@ -446,8 +605,11 @@ class ReviewHelper(object):
 
     # When merging remove the project name ("[project]") prefix from
     # the code review description.
-    self._merge_description = self._PROJECT_NAME_PREFIX_REGEX.sub(
-        u'', self._merge_description)
+    for project_name_prefix in self._PROJECT_NAME_PREFIXES:
+      if self._merge_description.startswith(project_name_prefix):
+        self._merge_description = self._merge_description[
+            len(project_name_prefix):]
+        break
 
     merge_email_address = codereview_information.get(u'owner_email', None)
     if not merge_email_address:
@@ -457,7 +619,7 @@ class ReviewHelper(object):
               self._command.title(), codereview_issue_number))
       return False
 
-    github_user_information = self._github_helper.QueryUser(self._fork_username)
+    github_user_information = self._github_user_result.get()
     if not github_user_information:
       print((
           u'{0:s} aborted - unable to retrieve github user: {1:s} '
@@ -506,17 +668,15 @@ class ReviewHelper(object):
     Returns:
       bool: True if the tests were successful.
     """
-    if self._project_name == u'l2tdocs':
+    if self._project_name in self._SKIP_PROJECTS:
       return True
 
-    if self._command not in (
-        u'create', u'lint-test', u'lint_test', u'merge', u'test', u'update'):
+    if self._command not in self._TEST_COMMANDS:
       return True
 
     # TODO: determine why this alters the behavior of argparse.
     # Currently affects this script being used in plaso.
-    command = u'{0:s} run_tests.py'.format(sys.executable)
-    exit_code = subprocess.call(command, shell=True)
+    exit_code = subprocess.call([sys.executable, u'run_tests.py'])
     if exit_code != 0:
       print(u'{0:s} aborted - unable to pass tests.'.format(
           self._command.title()))
@@ -535,31 +695,17 @@ class ReviewHelper(object):
     Returns:
       bool: True if the update was successful.
     """
-    review_file = reviewfile.ReviewFile(self._active_branch)
-    if not review_file.Exists():
+    review_index = reviewindex.ReviewIndex()
+    if not review_index.HasBranch(self._active_branch):
       print(u'Review file missing for branch: {0:s}'.format(
           self._active_branch))  # yapf: disable
       return False
 
-    codereview_issue_number = review_file.GetCodeReviewIssueNumber()
+    codereview_issue_number = review_index.GetCodeReviewIssueNumber(
+        self._active_branch)
 
     last_commit_message = self._git_helper.GetLastCommitMessage()
-    print(u'Automatic generated description of the update:')
-    print(last_commit_message)
-    print(u'')
-
-    if self._no_confirm:
-      user_input = None
-    else:
-      print(u'Enter a description for the update or hit enter to use the')
-      print(u'automatic generated one:')
-      user_input = sys.stdin.readline()
-      user_input = user_input.strip()
-
-    if not user_input:
-      description = last_commit_message
-    else:
-      description = user_input
+    description = self._ReadDescription(u'update', last_commit_message)
 
     if not self._codereview_helper.UpdateIssue(
         codereview_issue_number, self._diffbase, description):   # yapf: disable
@@ -575,7 +721,7 @@ class ReviewHelper(object):
     Returns:
       bool: True if the authors update was successful.
     """
-    if self._project_name == u'l2tdocs':
+    if self._project_name in self._SKIP_PROJECTS:
       return True
 
     if not self._project_helper.UpdateAuthorsFile():
@@ -590,15 +736,7 @@ class ReviewHelper(object):
     Returns:
       bool: True if the version update was successful.
     """
-    if self._project_name == u'l2tdocs':
+    if self._project_name in self._SKIP_PROJECTS:
       return True
 
-    if not self._project_helper.UpdateVersionFile():
-      print(u'Unable to update version file.')
-      return False
-
-    if not self._project_helper.UpdateDpkgChangelogFile():
-      print(u'Unable to update dpkg changelog file.')
-      return False
-
-    return True
+    return self._UpdateVersionFiles()
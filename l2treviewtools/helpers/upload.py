@@ -2,24 +2,23 @@
 """Helper for interacting with the Codereview upload.py tool."""
 
 from __future__ import print_function
+import hashlib
 import json
 import logging
 import os
 import random
 import sys
+import threading
+import time
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
 
-# pylint: disable=import-error,no-name-in-module
-if sys.version_info[0] < 3:
-  import urllib2 as urllib_error
-  import urllib as  urllib_parse
-  import urllib2 as urllib_request
-else:
-  import urllib.error as urllib_error
-  import urllib.parse as urllib_parse
-  import urllib.request as urllib_request
-
-# pylint: disable=wrong-import-position
 from l2treviewtools.helpers import cli
+from l2treviewtools.helpers import url_lib
+from l2treviewtools.lib import errors
 from l2treviewtools.lib import upload as upload_tool
 
 
@@ -66,21 +65,78 @@ class UploadHelper(cli.CLIHelper):
 
   # yapf: enable
 
-  def __init__(self, email_address, no_browser=False):
+  # The reviewers including the reviewers on CC, which are determined once.
+  _REVIEWERS_DEFAULT_WITH_CC = _REVIEWERS_DEFAULT.union(_REVIEWERS_CC)
+
+  _REVIEWERS_WITH_CC_PER_PROJECT = dict(zip(
+      _REVIEWERS_PER_PROJECT.keys(),
+      map(_REVIEWERS_CC.union, _REVIEWERS_PER_PROJECT.values())))
+
+  _CLOSE_URL = u'https://codereview.appspot.com/{0!s}/close'
+
+  _ISSUE_API_URL = u'https://codereview.appspot.com/api/{0:s}'
+
+  # Marker of the issue URL in the upload.py output, which is a byte string
+  # so that the output can be searched before it is decoded.
+  _ISSUE_URL_MARKER = b'URL: http://codereview.appspot.com/'
+
+  # Form fields to publish a message, without the message itself.
+  _PUBLISH_FORM_FIELDS = {
+      u'add_as_reviewer': u'False',
+      u'message_only': u'True',
+      u'no_redirect': u'True',
+      u'send_mail': u'True'}
+
+  _PUBLISH_URL = u'https://codereview.appspot.com/{0!s}/publish'
+
+  # Number of seconds a XSRF token is kept in the response cache.
+  _XSRF_TOKEN_CACHE_TIME = 3600
+
+  _XSRF_TOKEN_URL = u'https://codereview.appspot.com/xsrf_token'
+
+  def __init__(
+      self, email_address, isolate=False, no_browser=False,
+      response_cache=None, url_lib_helper=None):
     """Initializes a codereview helper.
 
     Args:
       email_address (str): email address.
+      isolate (Optional[bool]): True if upload.py should be run in a separate
+          process instead of in the current process.
       no_browser (Optional[bool]): True if the functionality to use the
           webbrowser to get the OAuth token should be disabled.
+      response_cache (Optional[ResponseCache]): cache of responses, which
+          is used to reuse the XSRF token between runs.
+      url_lib_helper (Optional[URLLibHelper]): URL library helper, which
+          can be shared with other helpers to reuse its connections.
     """
     super(UploadHelper, self).__init__()
     self._access_token = None
     self._email_address = email_address
+    self._issues = {}
+    self._isolate = isolate
+    self._issues_lock = threading.Lock()
     self._no_browser = no_browser
+    self._response_cache = response_cache
+    # Note that a reentrant lock is used since retrieving the XSRF token
+    # requires the access token.
+    self._tokens_lock = threading.RLock()
     self._upload_py_path = os.path.join(u'l2treviewtools', u'lib', u'upload.py')
+    self._upload_tool_issue_number = None
+    self._url_lib_helper = url_lib_helper or url_lib.URLLibHelper()
     self._xsrf_token = None
 
+  def _GetAuthorizationHeaders(self, codereview_access_token):
+    """Retrieves the HTTP headers to authorize a request to codereview.
+
+    Args:
+      codereview_access_token (str): codereview access token.
+
+    Returns:
+      dict[str, str]: HTTP headers.
+    """
+    return {u'Authorization': u'OAuth {0:s}'.format(codereview_access_token)}
+
   def _GetReviewer(self, project_name):
     """Determines the reviewer.
 
@@ -90,17 +146,11 @@ class UploadHelper(cli.CLIHelper):
     Returns:
       str: email address of the reviewer that is used on codereview.
     """
-    reviewers = list(
-        self._REVIEWERS_PER_PROJECT.get(project_name, self._REVIEWERS_DEFAULT))
-
-    try:
-      reviewers.remove(self._email_address)
-    except ValueError:
-      pass
+    reviewers = self._REVIEWERS_PER_PROJECT.get(
+        project_name, self._REVIEWERS_DEFAULT)
+    reviewers = reviewers.difference([self._email_address])
 
-    random.shuffle(reviewers)
-
-    return reviewers[0]
+    return random.choice(sorted(reviewers))
 
   def _GetReviewersOnCC(self, project_name, reviewer):
     """Determines the reviewers on CC.
@@ -112,142 +162,214 @@ class UploadHelper(cli.CLIHelper):
     Returns:
       str: comma separated email addresses.
     """
-    reviewers_cc = set(
-        self._REVIEWERS_PER_PROJECT.get(project_name, self._REVIEWERS_DEFAULT))
-    reviewers_cc.update(self._REVIEWERS_CC)
+    reviewers_cc = self._REVIEWERS_WITH_CC_PER_PROJECT.get(
+        project_name, self._REVIEWERS_DEFAULT_WITH_CC)
+    reviewers_cc = reviewers_cc.difference([reviewer, self._email_address])
 
-    reviewers_cc.remove(reviewer)
+    # The reviewers on CC are sorted so that the order does not change
+    # between code reviews.
+    return u','.join(sorted(reviewers_cc))
 
-    try:
-      reviewers_cc.remove(self._email_address)
-    except KeyError:
-      pass
+  def _GetXSRFTokenCacheKey(self, codereview_access_token):
+    """Retrieves the key of the XSRF token in the response cache.
 
-    return u','.join(reviewers_cc)
+    The key contains a hash of the access token, so that the XSRF token is
+    only reused for the access token it was retrieved with, without storing
+    the access token itself.
 
-  def AddMergeMessage(self, issue_number, message):
-    """Adds a merge message to the code review issue.
+    Args:
+      codereview_access_token (str): codereview access token.
 
-    Where the merge is a commit to the main project git repository.
+    Returns:
+      str: key of the XSRF token in the response cache.
+    """
+    access_token_hash = hashlib.sha256(
+        codereview_access_token.encode(u'utf-8')).hexdigest()
+    return u'codereview_xsrf_token:{0:s}'.format(access_token_hash)
+
+  def _PostForm(self, codereview_url, form_fields):
+    """Posts a form with the XSRF token to codereview.
+
+    If codereview rejects the XSRF token, for example because the cached
+    token has expired, a new XSRF token is retrieved and the form is posted
+    once more.
 
     Args:
-      issue_number (int|str): codereview issue number.
-      message (str): message to add to the code review issue.
+      codereview_url (str): codereview URL to post the form to.
+      form_fields (dict[str, str]): form fields, without the XSRF token.
 
-    Returns:
-      bool: merge message was added to the code review issue.
+    Raises:
+      ConnectionError: if the form could not be posted.
     """
     codereview_access_token = self.GetAccessToken()
     xsrf_token = self.GetXSRFToken()
     if not codereview_access_token or not xsrf_token:
-      return False
+      raise errors.ConnectionError(u'Missing access or XSRF token.')
 
-    codereview_url = b'https://codereview.appspot.com/{0!s}/publish'.format(
-        issue_number)
+    headers = self._GetAuthorizationHeaders(codereview_access_token)
 
-    post_data = urllib_parse.urlencode({
-        u'add_as_reviewer': u'False',
-        u'message': message,
-        u'message_only': u'True',
-        u'no_redirect': 'True',
-        u'send_mail': 'True',
-        u'xsrf_token': xsrf_token})
+    post_data = dict(form_fields)
+    post_data[u'xsrf_token'] = xsrf_token
 
-    request = urllib_request.Request(codereview_url)
+    try:
+      self._url_lib_helper.Request(
+          codereview_url, post_data=post_data, headers=headers,
+          read_data=False)
+      return
 
-    # Add header: Authorization: OAuth <codereview access token>
-    request.add_header(
-        u'Authorization', u'OAuth {0:s}'.format(codereview_access_token))
+    except errors.HTTPError as exception:
+      if exception.status_code != 403:
+        raise
 
-    # This will change the request into a POST.
-    request.add_data(post_data)
+    self._RemoveXSRFToken()
+    xsrf_token = self.GetXSRFToken()
+    if not xsrf_token:
+      raise errors.ConnectionError(u'Missing XSRF token.')
 
-    try:
-      url_object = urllib_request.urlopen(request)
-    except urllib_error.HTTPError as exception:
-      logging.error(
-          u'Failed publish to codereview issue: {0!s} with error: {1!s}'.format(
-              issue_number, exception))
-      return False
+    post_data[u'xsrf_token'] = xsrf_token
+    self._url_lib_helper.Request(
+        codereview_url, post_data=post_data, headers=headers, read_data=False)
 
-    if url_object.code not in (200, 201):
-      logging.error((
-          u'Failed publish to codereview issue: {0!s} with status code: '
-          u'{1:d}').format(issue_number, url_object.code))
-      return False
+  def _PrintUploadToolOutputLine(self, line):
+    """Prints a line of upload.py output and looks for the issue number.
 
-    return True
+    Args:
+      line (bytes): line of upload.py output.
+    """
+    print(line.decode(u'utf-8'), end=u'')
 
-  def CloseIssue(self, issue_number):
-    """Closes a code review issue.
+    # upload.py reports the URL of the issue as:
+    # Issue created. URL: http://codereview.appspot.com/12345
+    issue_number_offset = line.find(self._ISSUE_URL_MARKER)
+    if issue_number_offset >= 0:
+      issue_number_offset += len(self._ISSUE_URL_MARKER)
+      issue_number = line[issue_number_offset:].strip()
+      self._upload_tool_issue_number = issue_number.decode(u'utf-8')
 
-    Args:
-      issue_number (int|str): codereview issue number.
+  def _RemoveXSRFToken(self):
+    """Removes the XSRF token, including from the response cache."""
+    with self._tokens_lock:
+      self._xsrf_token = None
+
+      if self._response_cache and self._access_token:
+        cache_key = self._GetXSRFTokenCacheKey(self._access_token)
+        self._response_cache.RemoveResponse(cache_key)
+
+  def _RetrieveXSRFToken(self):
+    """Retrieves a XSRF token from the response cache or codereview.
 
     Returns:
-      bool: True if the code review was closed.
+      str: codereview XSRF token or None if the token could not be obtained.
     """
     codereview_access_token = self.GetAccessToken()
-    xsrf_token = self.GetXSRFToken()
-    if not codereview_access_token or not xsrf_token:
-      return False
-
-    codereview_url = b'https://codereview.appspot.com/{0!s}/close'.format(
-        issue_number)
+    if not codereview_access_token:
+      return
 
-    post_data = urllib_parse.urlencode({u'xsrf_token': xsrf_token})
+    cache_key = self._GetXSRFTokenCacheKey(codereview_access_token)
 
-    request = urllib_request.Request(codereview_url)
+    cached_response = None
+    if self._response_cache:
+      cached_response = self._response_cache.GetResponse(cache_key)
 
-    # Add header: Authorization: OAuth <codereview access token>
-    request.add_header(
-        u'Authorization', u'OAuth {0:s}'.format(codereview_access_token))
+    if cached_response:
+      _, response_data, timestamp = cached_response
+      if time.time() - timestamp < self._XSRF_TOKEN_CACHE_TIME:
+        return response_data.decode(u'utf-8')
 
-    # This will change the request into a POST.
-    request.add_data(post_data)
+    headers = self._GetAuthorizationHeaders(codereview_access_token)
+    headers[u'X-Requesting-XSRF-Token'] = u'1'
 
     try:
-      url_object = urllib_request.urlopen(request)
-    except urllib_error.HTTPError as exception:
+      response_data = self._url_lib_helper.Request(
+          self._XSRF_TOKEN_URL, headers=headers)
+
+    except errors.ConnectionError as exception:
       logging.error(
-          u'Failed closing codereview issue: {0!s} with error: {1!s}'.format(
-              issue_number, exception))
-      return False
+          u'Failed retrieving codereview XSRF token with error: {0!s}'.format(
+              exception))
+      return
 
-    if url_object.code != 200:
-      logging.error((
-          u'Failed closing codereview issue: {0!s} with status code: '
-          u'{1:d}').format(issue_number, url_object.code))
-      return False
+    xsrf_token = response_data.decode(u'utf-8')
 
-    return True
+    if self._response_cache and xsrf_token:
+      self._response_cache.SetResponse(cache_key, None, response_data)
 
-  def CreateIssue(self, project_name, diffbase, description):
-    """Creates a new codereview issue.
+    return xsrf_token
+
+  def _RunUploadTool(self, arguments):
+    """Runs the upload.py tool.
 
     Args:
-      project_name (str): name of the project.
-      diffbase (str): diffbase.
-      description (str): description.
+      arguments (list[str]): arguments of the upload.py operation, which are
+          passed as-is, without having to be quoted.
 
     Returns:
-      int: codereview issue number or None.
+      str: codereview issue number or None if the upload failed.
     """
-    reviewer = self._GetReviewer(project_name)
-    reviewers_cc = self._GetReviewersOnCC(project_name, reviewer)
+    command = [sys.executable, self._upload_py_path, u'--oauth2']
+    if self._no_browser:
+      command.append(u'--no_oauth2_webbrowser')
 
-    command = u'{0:s} {1:s} --oauth2'.format(
-        sys.executable, self._upload_py_path)
+    command.extend(arguments)
 
-    if self._no_browser:
-      command = u'{0:s} --no_oauth2_webbrowser'.format(command)
+    if self._isolate:
+      return self._RunUploadToolInSubprocess(command)
+
+    return self._RunUploadToolInProcess(command[1:])
+
+  def _RunUploadToolInProcess(self, argv):
+    """Runs the upload.py tool in the current process.
+
+    This prevents the start up of a separate Python interpreter. The output
+    of upload.py, including its prompts, is written to stdout directly.
+
+    Args:
+      argv (list[str]): upload.py command line arguments, including the path
+          of upload.py.
+
+    Returns:
+      str: codereview issue number or None if the upload failed.
+    """
+    # Note that upload.py sets the locale of the version control system
+    # commands it runs.
+    lc_all = os.environ.get(u'LC_ALL', None)
+    os.environ[u'LC_ALL'] = u'C'
+
+    try:
+      issue_number, _ = upload_tool.RealMain(argv)
+
+    except SystemExit as exception:
+      if exception.code:
+        logging.error(u'upload.py failed with exit code: {0!s}'.format(
+            exception.code))
+      return
+
+    # upload.py raises various exceptions, for example when a request fails,
+    # which would otherwise terminate the review script.
+    except Exception as exception:  # pylint: disable=broad-except
+      logging.error(u'upload.py failed with error: {0!s}'.format(exception))
+      return
+
+    finally:
+      if lc_all is None:
+        del os.environ[u'LC_ALL']
+      else:
+        os.environ[u'LC_ALL'] = lc_all
+
+    return issue_number
 
-    command = (
-        u'{0:s} --send_mail -r {1:s} --cc {2:s} -t "{3:s}" -y -- '
-        u'{4:s}').format(
-            command, reviewer, reviewers_cc, description, diffbase)
+  def _RunUploadToolInSubprocess(self, command):
+    """Runs the upload.py tool in a separate process.
 
+    Args:
+      command (list[str]): upload.py command.
+
+    Returns:
+      str: codereview issue number or None if the upload failed.
+    """
     if self._no_browser:
+      # The output of upload.py is read per line, hence its prompt for
+      # the access token, which has no end-of-line, is printed here.
       print(
           u'Upload server: codereview.appspot.com (change with -s/--server)\n'
           u'Go to the following link in your browser:\n'
@@ -260,21 +382,88 @@ class UploadHelper(cli.CLIHelper):
 
       sys.stdout.flush()
 
-    exit_code, output, _ = self.RunCommand(command)
-    print(output)
-
+    # The output of upload.py is printed as it is produced, instead of after
+    # upload.py has completed, while the issue number is looked for.
+    self._upload_tool_issue_number = None
+    exit_code = self.RunCommandWithOutputCallback(
+        command, self._PrintUploadToolOutputLine)
     if exit_code != 0:
       return
 
-    issue_url_line_start = (
-        u'Issue created. URL: http://codereview.appspot.com/')
-    for line in output.split(b'\n'):
-      if issue_url_line_start in line:
-        _, _, issue_number = line.rpartition(issue_url_line_start)
-        try:
-          return int(issue_number, 10)
-        except ValueError:
-          pass
+    return self._upload_tool_issue_number
+
+  def AddMergeMessage(self, issue_number, message):
+    """Adds a merge message to the code review issue.
+
+    Where the merge is a commit to the main project git repository.
+
+    Args:
+      issue_number (int|str): codereview issue number.
+      message (str): message to add to the code review issue.
+
+    Returns:
+      bool: merge message was added to the code review issue.
+    """
+    codereview_url = self._PUBLISH_URL.format(issue_number)
+
+    form_fields = dict(self._PUBLISH_FORM_FIELDS)
+    form_fields[u'message'] = message
+
+    try:
+      self._PostForm(codereview_url, form_fields)
+
+    except errors.ConnectionError as exception:
+      logging.error(
+          u'Failed publish to codereview issue: {0!s} with error: {1!s}'.format(
+              issue_number, exception))
+      return False
+
+    return True
+
+  def CloseIssue(self, issue_number):
+    """Closes a code review issue.
+
+    Args:
+      issue_number (int|str): codereview issue number.
+
+    Returns:
+      bool: True if the code review was closed.
+    """
+    codereview_url = self._CLOSE_URL.format(issue_number)
+
+    try:
+      self._PostForm(codereview_url, {})
+
+    except errors.ConnectionError as exception:
+      logging.error(
+          u'Failed closing codereview issue: {0!s} with error: {1!s}'.format(
+              issue_number, exception))
+      return False
+
+    return True
+
+  def CreateIssue(self, project_name, diffbase, description):
+    """Creates a new codereview issue.
+
+    Args:
+      project_name (str): name of the project.
+      diffbase (str): diffbase.
+      description (str): description.
+
+    Returns:
+      int: codereview issue number or None.
+    """
+    reviewer = self._GetReviewer(project_name)
+    reviewers_cc = self._GetReviewersOnCC(project_name, reviewer)
+
+    issue_number = self._RunUploadTool([
+        u'--send_mail', u'-r', reviewer, u'--cc', reviewers_cc,
+        u'-t', description, u'-y', u'--', diffbase])
+
+    try:
+      return int(issue_number, 10)
+    except (TypeError, ValueError):
+      pass
 
   def GetAccessToken(self):
     """Retrieves the OAuth access token.
@@ -282,49 +471,31 @@ class UploadHelper(cli.CLIHelper):
     Returns:
       str: codereview access token.
     """
+    # The lock prevents concurrent requests from each retrieving the access
+    # token, which can involve the user.
     if not self._access_token:
-      # TODO: add support to get access token directly from user.
-      self._access_token = upload_tool.GetAccessToken()
-      if not self._access_token:
-        logging.error(u'Unable to retrieve access token.')
+      with self._tokens_lock:
+        if not self._access_token:
+          # TODO: add support to get access token directly from user.
+          self._access_token = upload_tool.GetAccessToken()
+          if not self._access_token:
+            logging.error(u'Unable to retrieve access token.')
 
     return self._access_token
 
   def GetXSRFToken(self):
     """Retrieves the XSRF token.
 
+    If a response cache is available, a XSRF token that was retrieved with
+    the same access token within the cache time is reused.
+
     Returns:
       str: codereview XSRF token or None if the token could not be obtained.
     """
     if not self._xsrf_token:
-      codereview_access_token = self.GetAccessToken()
-      if not codereview_access_token:
-        return
-
-      codereview_url = b'https://codereview.appspot.com/xsrf_token'
-
-      request = urllib_request.Request(codereview_url)
-
-      # Add header: Authorization: OAuth <codereview access token>
-      request.add_header(
-          u'Authorization', u'OAuth {0:s}'.format(codereview_access_token))
-      request.add_header(u'X-Requesting-XSRF-Token', u'1')
-
-      try:
-        url_object = urllib_request.urlopen(request)
-      except urllib_error.HTTPError as exception:
-        logging.error(
-            u'Failed retrieving codereview XSRF token with error: {0!s}'.format(
-                exception))
-        return
-
-      if url_object.code != 200:
-        logging.error((
-            u'Failed retrieving codereview XSRF token with status code: '
-            u'{0:d}').format(url_object.code))
-        return
-
-      self._xsrf_token = url_object.read()
+      with self._tokens_lock:
+        if not self._xsrf_token:
+          self._xsrf_token = self._RetrieveXSRFToken()
 
     return self._xsrf_token
 
@@ -352,33 +523,40 @@ class UploadHelper(cli.CLIHelper):
     Where the "created" and "modified" strings are formatted as:
     "YYYY-MM-DD hh:mm:ss.######"
 
+    The information is retrieved once per issue, also when it is queried
+    from multiple threads.
+
     Args:
       issue_number (int|str): codereview issue number.
 
     Returns:
       dict[str,object]: JSON response or None.
     """
-    codereview_url = b'https://codereview.appspot.com/api/{0!s}'.format(
-        issue_number)
+    issue_key = u'{0!s}'.format(issue_number)
 
-    request = urllib_request.Request(codereview_url)
+    with self._issues_lock:
+      issue_information = self._issues.get(issue_key, None)
+      if not issue_information:
+        codereview_url = self._ISSUE_API_URL.format(issue_key)
 
-    try:
-      url_object = urllib_request.urlopen(request)
-    except urllib_error.HTTPError as exception:
-      logging.error(
-          u'Failed querying codereview issue: {0!s} with error: {1!s}'.format(
-              issue_number, exception))
-      return
+        try:
+          response_data = self._url_lib_helper.Request(codereview_url)
 
-    if url_object.code != 200:
-      logging.error((
-          u'Failed querying codereview issue: {0!s} with status code: '
-          u'{1:d}').format(issue_number, url_object.code))
-      return
+        except errors.ConnectionError as exception:
+          logging.error((
+              u'Failed querying codereview issue: {0:s} with error: '
+              u'{1!s}').format(issue_key, exception))
+          return
+
+        # orjson, if available, decodes the JSON data directly from bytes.
+        if orjson:
+          issue_information = orjson.loads(response_data)
+        else:
+          issue_information = json.loads(response_data.decode(u'utf-8'))
 
-    response_data = url_object.read()
-    return json.loads(response_data)
+        self._issues[issue_key] = issue_information
+
+    return issue_information
 
   def UpdateIssue(self, issue_number, diffbase, description):
     """Updates a code review issue.
@@ -391,29 +569,8 @@ class UploadHelper(cli.CLIHelper):
     Returns:
       bool: True if the code review was updated.
     """
-    command = u'{0:s} {1:s} --oauth2'.format(
-        sys.executable, self._upload_py_path)
-
-    if self._no_browser:
-      command = u'{0:s} --no_oauth2_webbrowser'.format(command)
-
-    command = (u'{0:s} -i {1!s} -m "Code updated." -t "{2:s}" -y -- '
-               u'{3:s}').format(command, issue_number, description, diffbase)
-
-    if self._no_browser:
-      print(
-          u'Upload server: codereview.appspot.com (change with -s/--server)\n'
-          u'Go to the following link in your browser:\n'
-          u'\n'
-          u'    https://codereview.appspot.com/get-access-token\n'
-          u'\n'
-          u'and copy the access token.\n'
-          u'\n')
-      print(u'Enter access token:', end=u' ')
-
-      sys.stdout.flush()
-
-    exit_code, output, _ = self.RunCommand(command)
-    print(output)
+    updated_issue_number = self._RunUploadTool([
+        u'-i', u'{0!s}'.format(issue_number), u'-m', u'Code updated.',
+        u'-t', description, u'-y', u'--', diffbase])
 
-    return exit_code == 0
+    return updated_issue_number is not None
@@ -1,50 +1,471 @@
 # -*- coding: utf-8 -*-
 """Helper for using URL library (urllib)."""
 
+import socket
 import sys
+import threading
+import time
+import zlib
 
 # pylint: disable=import-error,no-name-in-module
 if sys.version_info[0] < 3:
-  import urllib2 as urllib_error
-  import urllib2 as urllib_request
+  import httplib as http_client
+  import urlparse as urllib_parse
+  from urllib import getproxies
+  from urllib import proxy_bypass
+  from urllib import urlencode
 else:
-  import urllib.error as urllib_error
-  import urllib.request as urllib_request
+  import http.client as http_client
+  import urllib.parse as urllib_parse
+  from urllib.parse import urlencode
+  from urllib.request import getproxies
+  from urllib.request import proxy_bypass
 
 from l2treviewtools.lib import errors  # pylint: disable=wrong-import-position
 
 
 class URLLibHelper(object):
-  """URL library (urllib) helper."""
+  """URL library (urllib) helper.
 
-  def Request(self, url, post_data=None):
+  The helper keeps the connection to every host it has sent a request to
+  open, so that subsequent requests to the same host reuse the connection
+  (HTTP keep-alive) instead of setting up a new TCP and TLS session.
+
+  GET requests that fail due to a connection error or a temporary server
+  error are retried with an exponential backoff. POST requests are only
+  retried once, when the server closed a kept open connection before
+  the request was sent or before it responded, since a POST request must
+  not be processed more than once.
+  A single helper can be shared by multiple other helpers and threads, where
+  every concurrent request to the same host uses a separate connection.
+
+  Like urllib, redirects of GET requests are followed and the proxies defined
+  by the http_proxy and https_proxy environment variables are used.
+  """
+
+  _MAXIMUM_NUMBER_OF_ATTEMPTS = 4
+
+  # Size of the chunks in which response data that is not used is discarded.
+  _DISCARD_CHUNK_SIZE = 65536
+
+  # Maximum number of connections per host that are kept open.
+  _MAXIMUM_NUMBER_OF_IDLE_CONNECTIONS = 4
+
+  _MAXIMUM_NUMBER_OF_REDIRECTS = 5
+
+  _REDIRECT_STATUS_CODES = frozenset([301, 302, 303, 307, 308])
+
+  # Number of seconds to wait before the second retry, which is doubled for
+  # every subsequent retry. The first retry is made immediately since it
+  # typically is caused by the server having closed the kept open connection.
+  _RETRY_BACKOFF_FACTOR = 0.3
+
+  _RETRY_STATUS_CODES = frozenset([502, 503, 504])
+
+  _TIMEOUT = 30
+
+  # Some web services, such as the github API, reject requests without
+  # an User-Agent header.
+  _USER_AGENT = u'l2treviewtools'
+
+  def __init__(self):
+    """Initializes an URL library (urllib) helper."""
+    super(URLLibHelper, self).__init__()
+    self._connections_lock = threading.Lock()
+    self._idle_connections = {}
+    self._proxies = getproxies()
+
+  def _AcquireConnection(self, scheme, host):
+    """Acquires a connection to a host.
+
+    Args:
+      scheme (str): URL scheme, either "http" or "https".
+      host (str): host and optional port.
+
+    Returns:
+      httplib.HTTPConnection: connection to the host, which is either
+          a connection that was kept open or a new connection.
+
+    Raises:
+      ConnectionError: if the URL scheme is not supported.
+    """
+    with self._connections_lock:
+      idle_connections = self._idle_connections.get((scheme, host), None)
+      if idle_connections:
+        return idle_connections.pop()
+
+    if scheme == u'https':
+      connection_class = http_client.HTTPSConnection
+    elif scheme == u'http':
+      connection_class = http_client.HTTPConnection
+    else:
+      raise errors.ConnectionError(
+          u'Unsupported URL scheme: {0:s}'.format(scheme))
+
+    proxy_host = self._GetProxyHost(scheme, host)
+    if not proxy_host:
+      return connection_class(host, timeout=self._TIMEOUT)
+
+    connection = connection_class(proxy_host, timeout=self._TIMEOUT)
+    if scheme == u'https':
+      # The HTTPS connection is tunneled through the proxy with CONNECT.
+      connection.set_tunnel(host)
+
+    return connection
+
+  def _DecompressResponseData(self, content_encoding, response_data):
+    """Decompresses response data.
+
+    Args:
+      content_encoding (str): value of the Content-Encoding header of
+          the response or None if not available.
+      response_data (bytes): response data.
+
+    Returns:
+      bytes: decompressed response data.
+
+    Raises:
+      ConnectionError: if the response data cannot be decompressed.
+    """
+    if not response_data or (content_encoding or u'').lower() != u'gzip':
+      return response_data
+
+    try:
+      # Note that the window bits of 16 + MAX_WBITS indicate zlib should
+      # expect a gzip header.
+      return zlib.decompress(response_data, 16 + zlib.MAX_WBITS)
+    except zlib.error as exception:
+      raise errors.ConnectionError(
+          u'Unable to decompress response data with error: {0!s}'.format(
+              exception))
+
+  def _GetPostData(self, post_data):
+    """Retrieves the data to send.
+
+    Args:
+      post_data (bytes|dict[str, object]|list[bytes]): data to send, either
+          as a single byte string, as form fields or as chunks of data.
+
+    Returns:
+      bytes: data to send.
+    """
+    if isinstance(post_data, bytes):
+      return post_data
+
+    if isinstance(post_data, dict):
+      # The values are encoded as UTF-8 since urlencode on Python 2 does not
+      # support Unicode strings that contain non-ASCII characters.
+      form_fields = []
+      for name, value in sorted(post_data.items()):
+        if not isinstance(value, bytes):
+          value = u'{0!s}'.format(value).encode(u'utf-8')
+        form_fields.append((name, value))
+
+      return urlencode(form_fields).encode(u'utf-8')
+
+    # The chunks are accumulated in a bytearray, since concatenating byte
+    # strings copies the data for every chunk.
+    post_data_buffer = bytearray()
+    for chunk in post_data:
+      post_data_buffer.extend(chunk)
+
+    return bytes(post_data_buffer)
+
+  def _GetProxyHost(self, scheme, host):
+    """Retrieves the proxy to use for a host.
+
+    Args:
+      scheme (str): URL scheme, either "http" or "https".
+      host (str): host and optional port.
+
+    Returns:
+      str: host and optional port of the proxy or None if no proxy should
+          be used.
+    """
+    proxy_url = self._proxies.get(scheme, None)
+    if not proxy_url or proxy_bypass(host):
+      return
+
+    # Note that a proxy can be defined with or without an URL scheme and
+    # that proxy credentials are not supported.
+    if u'://' not in proxy_url:
+      proxy_url = u'http://{0:s}'.format(proxy_url)
+
+    proxy_host = urllib_parse.urlsplit(proxy_url).netloc
+    _, _, proxy_host = proxy_host.rpartition(u'@')
+    return proxy_host or None
+
+  def _IsClosedWithoutResponse(self, exception):
+    """Determines if a connection was closed before a response was received.
+
+    Args:
+      exception (Exception): exception raised by the connection.
+
+    Returns:
+      bool: True if the connection was closed by the server before any
+          response data was received.
+    """
+    remote_disconnected = getattr(http_client, u'RemoteDisconnected', None)
+    if remote_disconnected:
+      return isinstance(exception, remote_disconnected)
+
+    # On Python 2 httplib raises BadStatusLine instead, with an empty line or,
+    # in later Python 2.7 versions, with a message that no status line was
+    # received.
+    if not isinstance(exception, http_client.BadStatusLine):
+      return False
+
+    return exception.line in (u'', u"''") or exception.line.startswith(
+        u'No status line received')
+
+  def _ReleaseConnection(self, scheme, host, connection):
+    """Releases a connection to a host, so that it can be reused.
+
+    Args:
+      scheme (str): URL scheme, either "http" or "https".
+      host (str): host and optional port.
+      connection (httplib.HTTPConnection): connection to the host.
+    """
+    with self._connections_lock:
+      idle_connections = self._idle_connections.setdefault((scheme, host), [])
+      if len(idle_connections) < self._MAXIMUM_NUMBER_OF_IDLE_CONNECTIONS:
+        idle_connections.append(connection)
+        return
+
+    connection.close()
+
+  def Close(self):
+    """Closes the open connections."""
+    with self._connections_lock:
+      for idle_connections in self._idle_connections.values():
+        for connection in idle_connections:
+          connection.close()
+
+      self._idle_connections = {}
+
+  def _SendRequest(self, url, post_data=None, headers=None, read_data=True):
+    """Sends a request to an URL and follows redirects of GET requests.
+
+    Args:
+      url (str): URL to send the request.
+      post_data (Optional[bytes|dict[str, object]|list[bytes]]): data to
+          send, either as a single byte string, as form fields or as chunks
+          of data, where None represents a GET request and any other value
+          a POST request.
+      headers (Optional[dict[str, str]]): HTTP headers to send.
+      read_data (Optional[bool]): True if the response data should be
+          returned, otherwise the response data is discarded.
+
+    Returns:
+      tuple[int, httplib.HTTPMessage, bytes]: status code, headers and data
+          of the response, where the data is None if it was discarded.
+
+    Raises:
+      ConnectionError: if the request failed.
+    """
+    request_headers = {}
+    if headers:
+      request_headers.update(headers)
+
+    for _ in range(self._MAXIMUM_NUMBER_OF_REDIRECTS + 1):
+      status_code, response_headers, response_data = self._SendRequestToURL(
+          url, post_data=post_data, headers=request_headers,
+          read_data=read_data)
+
+      # POST requests are not redirected, since the server could have
+      # processed the request.
+      if (post_data is not None or
+          status_code not in self._REDIRECT_STATUS_CODES):
+        break
+
+      location = response_headers.get(u'Location', None)
+      if not location:
+        break
+
+      redirect_url = urllib_parse.urljoin(url, location)
+
+      # The credentials of the request are not passed to another host.
+      if (urllib_parse.urlsplit(redirect_url).netloc !=
+          urllib_parse.urlsplit(url).netloc):
+        request_headers.pop(u'Authorization', None)
+
+      url = redirect_url
+
+    return status_code, response_headers, response_data
+
+  def _SendRequestToURL(
+      self, url, post_data=None, headers=None, read_data=True):
+    """Sends a request to an URL without following redirects.
+
+    Args:
+      url (str): URL to send the request.
+      post_data (Optional[bytes|dict[str, object]|list[bytes]]): data to
+          send, either as a single byte string, as form fields or as chunks
+          of data, where None represents a GET request and any other value
+          a POST request.
+      headers (Optional[dict[str, str]]): HTTP headers to send.
+      read_data (Optional[bool]): True if the response data should be
+          returned, otherwise the response data is discarded.
+
+    Returns:
+      tuple[int, httplib.HTTPMessage, bytes]: status code, headers and data
+          of the response, where the data is None if it was discarded.
+
+    Raises:
+      ConnectionError: if the request failed.
+    """
+    url_segments = urllib_parse.urlsplit(url)
+
+    if url_segments.scheme == u'http' and self._GetProxyHost(
+        url_segments.scheme, url_segments.netloc):
+      # A HTTP proxy expects the absolute URL as the path of the request.
+      path = url
+    else:
+      path = url_segments.path or u'/'
+      if url_segments.query:
+        path = u'{0:s}?{1:s}'.format(path, url_segments.query)
+
+    # Response data that is read is requested to be compressed, since
+    # the responses of the web services typically are JSON or text.
+    request_headers = {u'User-Agent': self._USER_AGENT}
+    if read_data:
+      request_headers[u'Accept-Encoding'] = u'gzip'
+
+    if isinstance(post_data, dict):
+      request_headers[u'Content-Type'] = u'application/x-www-form-urlencoded'
+
+    if headers:
+      request_headers.update(headers)
+
+    if post_data is None:
+      method = u'GET'
+    else:
+      method = u'POST'
+      post_data = self._GetPostData(post_data)
+
+    connection = self._AcquireConnection(
+        url_segments.scheme, url_segments.netloc)
+
+    for attempt in range(self._MAXIMUM_NUMBER_OF_ATTEMPTS):
+      if attempt > 1:
+        time.sleep(self._RETRY_BACKOFF_FACTOR * (2 ** (attempt - 2)))
+
+      is_last_attempt = attempt + 1 == self._MAXIMUM_NUMBER_OF_ATTEMPTS
+
+      # A connection that was kept open still has its socket, which could
+      # have been closed by the server in the meantime.
+      is_kept_open_connection = connection.sock is not None
+      is_request_sent = False
+
+      try:
+        connection.request(
+            method, path, body=post_data, headers=request_headers)
+        is_request_sent = True
+
+        response = connection.getresponse()
+
+        if read_data:
+          response_data = self._DecompressResponseData(
+              response.getheader(u'Content-Encoding', None), response.read())
+        else:
+          # The response data still needs to be read for the connection to
+          # be reusable, but it is discarded instead of being kept in memory.
+          response_data = None
+          while response.read(self._DISCARD_CHUNK_SIZE):
+            pass
+
+      except (http_client.HTTPException, socket.error) as exception:
+        connection.close()
+
+        # A POST request is only retried when the server closed a kept open
+        # connection before the request could be sent or before responding,
+        # since otherwise the server could have processed the request. The
+        # retry uses a new connection, hence this happens at most once.
+        is_retryable = method == u'GET' or (
+            is_kept_open_connection and (
+                not is_request_sent or
+                self._IsClosedWithoutResponse(exception)))
+
+        if is_last_attempt or not is_retryable:
+          raise errors.ConnectionError(
+              u'Failed requesting URL with error: {0!s}'.format(exception))
+        continue
+
+      # Only GET requests are retried on a server error, since the server
+      # could have processed a POST request before the error occurred.
+      if (is_last_attempt or method != u'GET' or
+          response.status not in self._RETRY_STATUS_CODES):
+        break
+
+    self._ReleaseConnection(
+        url_segments.scheme, url_segments.netloc, connection)
+
+    return response.status, response.msg, response_data
+
+  def Request(self, url, post_data=None, headers=None, read_data=True):
     """Sends a request to an URL.
 
     Args:
       url (str): URL to send the request.
-      data (Optional[bytes]): data to send.
+      post_data (Optional[bytes|dict[str, object]|list[bytes]]): data to
+          send, either as a single byte string, as form fields or as chunks
+          of data, where None represents a GET request and any other value
+          a POST request.
+      headers (Optional[dict[str, str]]): HTTP headers to send.
+      read_data (Optional[bool]): True if the response data should be
+          returned, otherwise only the status of the response is checked.
 
     Returns:
-      bytes: response data.
+      bytes: response data or None if the response data was not read.
 
     Raises:
       ConnectionError: if the request failed.
+      HTTPError: if the response has an unexpected HTTP status code.
     """
-    request = urllib_request.Request(url)
+    status_code, _, response_data = self._SendRequest(
+        url, post_data=post_data, headers=headers, read_data=read_data)
 
-    if post_data is not None:
-      # This will change the request into a POST.
-      request.add_data(post_data)
+    if status_code not in (200, 201):
+      raise errors.HTTPError(
+          u'Failed requesting URL with status code: {0:d}'.format(
+              status_code), status_code)
 
-    try:
-      url_object = urllib_request.urlopen(request)
-    except urllib_error.HTTPError as exception:
-      raise errors.ConnectionError(
-          u'Failed triggering build with error: {0!s}'.format(exception))
+    return response_data
 
-    if url_object.code not in (200, 201):
-      raise errors.ConnectionError(
-          u'Failed triggering build with status code: {0:d}'.format(
-              url_object.code))
+  def RequestIfModified(self, url, etag=None, headers=None):
+    """Sends a conditional GET request to an URL.
+
+    Args:
+      url (str): URL to send the request.
+      etag (Optional[str]): entity tag (ETag) of a previous response, where
+          None represents an unconditional request.
+      headers (Optional[dict[str, str]]): HTTP headers to send.
+
+    Returns:
+      tuple[str, bytes]: entity tag (ETag) and data of the response, where
+          the data is None if the resource was not modified since the
+          previous response.
+
+    Raises:
+      ConnectionError: if the request failed.
+      HTTPError: if the response has an unexpected HTTP status code.
+    """
+    request_headers = {}
+    if headers:
+      request_headers.update(headers)
+
+    if etag:
+      request_headers[u'If-None-Match'] = etag
+
+    status_code, response_headers, response_data = self._SendRequest(
+        url, headers=request_headers)
+
+    if status_code == 304:
+      return etag, None
+
+    if status_code not in (200, 201):
+      raise errors.HTTPError(
+          u'Failed requesting URL with status code: {0:d}'.format(
+              status_code), status_code)
 
-    return url_object.read()
+    return response_headers.get(u'ETag', None), response_data
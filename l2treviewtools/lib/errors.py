@@ -8,3 +8,21 @@ class Error(Exception):
 
 class ConnectionError(Error):
   """Connection error."""
+
+
+class HTTPError(ConnectionError):
+  """HTTP error.
+
+  Attributes:
+    status_code (int): HTTP status code of the response.
+  """
+
+  def __init__(self, message, status_code):
+    """Initializes a HTTP error.
+
+    Args:
+      message (str): error message.
+      status_code (int): HTTP status code of the response.
+    """
+    super(HTTPError, self).__init__(message)
+    self.status_code = status_code
@@ -41,6 +41,14 @@ class NetRCFile(object):
       if value == u'github.com' and self._values[value_index - 1] == u'machine':
         return self._values[value_index + 1:]
 
+  def Exists(self):
+    """Determines if the .netrc file exists.
+
+    Returns:
+      bool: True if the .netrc file exists.
+    """
+    return self._contents is not None
+
   def GetGitHubAccessToken(self):
     """Retrieves the github access token.
 
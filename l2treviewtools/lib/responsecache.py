@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Implementation of a cache of web service responses."""
+import os
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache(object):
+  """Defines a response cache.
+
+  A response cache is used to store the responses of web service requests
+  together with their entity tag (ETag), so that a subsequent request can
+  be made conditional. The cache is stored in a SQLite database file and
+  can be used from multiple threads.
+  """
+
+  _CREATE_TABLE_QUERY = (
+      u'CREATE TABLE IF NOT EXISTS cached_response ('
+      u'key TEXT PRIMARY KEY, etag TEXT, body BLOB, timestamp INTEGER)')
+
+  _SELECT_QUERY = (
+      u'SELECT etag, body, timestamp FROM cached_response WHERE key = ?')
+
+  _DELETE_QUERY = u'DELETE FROM cached_response WHERE key = ?'
+
+  _INSERT_QUERY = (
+      u'INSERT OR REPLACE INTO cached_response (key, etag, body, timestamp) '
+      u'VALUES (?, ?, ?, ?)')
+
+  def __init__(self, path):
+    """Initializes a response cache.
+
+    If the directory of the cache file does not exist, it will be created.
+    Since the cache can contain tokens, the directory and the cache file are
+    only accessible by the user.
+
+    Args:
+      path (str): path of the cache file.
+
+    Raises:
+      sqlite3.Error: if the cache file cannot be opened.
+    """
+    super(ResponseCache, self).__init__()
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+      os.makedirs(directory, 0o700)
+
+    self._lock = threading.Lock()
+    self._connection = sqlite3.connect(path, check_same_thread=False)
+    self._connection.execute(self._CREATE_TABLE_QUERY)
+    self._connection.commit()
+
+    # The cache file is created with the default file mode, hence the mode is
+    # changed, which also restricts a cache file created by a previous version.
+    os.chmod(path, 0o600)
+
+  def Close(self):
+    """Closes the response cache."""
+    with self._lock:
+      self._connection.close()
+
+  def GetResponse(self, key):
+    """Retrieves a cached response.
+
+    Args:
+      key (str): key of the response, for example the request URL.
+
+    Returns:
+      tuple[str, bytes, int]: entity tag (ETag), data and POSIX timestamp
+          of when the response was stored or None if not available.
+    """
+    with self._lock:
+      row = self._connection.execute(self._SELECT_QUERY, (key, )).fetchone()
+
+    if not row:
+      return
+
+    etag, body, timestamp = row
+    return etag, bytes(body), timestamp
+
+  def RemoveResponse(self, key):
+    """Removes a cached response.
+
+    Args:
+      key (str): key of the response, for example the request URL.
+    """
+    with self._lock:
+      self._connection.execute(self._DELETE_QUERY, (key, ))
+      self._connection.commit()
+
+  def SetResponse(self, key, etag, body):
+    """Stores a response.
+
+    Args:
+      key (str): key of the response, for example the request URL.
+      etag (str): entity tag (ETag) of the response or None if not
+          available.
+      body (bytes): data of the response.
+    """
+    with self._lock:
+      self._connection.execute(
+          self._INSERT_QUERY,
+          (key, etag, sqlite3.Binary(body), int(time.time())))
+      self._connection.commit()
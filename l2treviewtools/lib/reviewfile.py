@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """Implementation of a file to store code review information."""
+import errno
 import os
 
 
@@ -11,15 +12,17 @@ class ReviewFile(object):
   named after the feature branch e.g. ".review/feature".
   """
 
-  def __init__(self, branch_name):
+  def __init__(self, branch_name, path=None):
     """Initializes a review file.
 
     Args:
       branch_name (str): name of the feature branch of the review.
+      path (Optional[str]): path of the review file, where None represents
+          the default path in the .review subdirectory.
     """
     super(ReviewFile, self).__init__()
     self._contents = None
-    self._path = os.path.join(u'.review', branch_name)
+    self._path = path or os.path.join(u'.review', branch_name)
 
     if os.path.exists(self._path):
       with open(self._path, 'r') as file_object:
@@ -36,8 +39,13 @@ class ReviewFile(object):
     Returns:
       bool: True if the review file was created.
     """
-    if not os.path.exists(u'.review'):
+    # Create the directory without checking if it exists first, which also
+    # prevents a race condition with another process creating it.
+    try:
       os.mkdir(u'.review')
+    except OSError as exception:
+      if exception.errno != errno.EEXIST:
+        raise
     with open(self._path, 'w') as file_object:
       file_object.write(u'{0!s}'.format(codereview_issue_number))
 
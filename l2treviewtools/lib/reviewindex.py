@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Implementation of an index to store code review information."""
+import errno
+import json
+import os
+
+from l2treviewtools.lib import reviewfile
+
+
+class ReviewIndex(object):
+  """Defines a review index.
+
+  A review index is used to track the codereview issue numbers of all the
+  feature branches in a single file, which is stored in the .review
+  subdirectory as ".review/index.json". The index is read once and kept in
+  memory.
+
+  Review files of individual feature branches that were created before
+  the review index was introduced, for example ".review/feature", are still
+  supported and are moved into the index when used.
+  """
+
+  _INDEX_FILENAME = u'index.json'
+
+  def __init__(self, path=u'.review'):
+    """Initializes a review index.
+
+    Args:
+      path (Optional[str]): path of the directory that contains the index.
+    """
+    super(ReviewIndex, self).__init__()
+    self._codereview_issue_numbers = {}
+    self._path = path
+    self._index_path = os.path.join(path, self._INDEX_FILENAME)
+
+    if os.path.exists(self._index_path):
+      with open(self._index_path, 'r') as file_object:
+        try:
+          self._codereview_issue_numbers = json.load(file_object)
+        except ValueError:
+          pass
+
+  def _GetReviewFile(self, branch_name):
+    """Retrieves the review file of a feature branch.
+
+    Args:
+      branch_name (str): name of the feature branch of the review.
+
+    Returns:
+      ReviewFile: review file or None if the feature branch has no review
+          file.
+    """
+    # The index file cannot be the review file of a feature branch.
+    if branch_name == self._INDEX_FILENAME:
+      return
+
+    review_file = reviewfile.ReviewFile(
+        branch_name, path=os.path.join(self._path, branch_name))
+    if not review_file.Exists():
+      return
+
+    return review_file
+
+  def _WriteIndex(self):
+    """Writes the index file.
+
+    If the directory of the index does not exist, it will be created.
+    """
+    try:
+      os.mkdir(self._path)
+    except OSError as exception:
+      if exception.errno != errno.EEXIST:
+        raise
+
+    with open(self._index_path, 'w') as file_object:
+      json.dump(
+          self._codereview_issue_numbers, file_object, indent=2,
+          sort_keys=True)
+
+  def GetCodeReviewIssueNumber(self, branch_name):
+    """Retrieves the codereview issue number of a feature branch.
+
+    Args:
+      branch_name (str): name of the feature branch of the review.
+
+    Returns:
+      int: codereview issue number or None if not available.
+    """
+    codereview_issue_number = self._codereview_issue_numbers.get(
+        branch_name, None)
+    if codereview_issue_number is None:
+      review_file = self._GetReviewFile(branch_name)
+      if not review_file:
+        return
+
+      codereview_issue_number = review_file.GetCodeReviewIssueNumber()
+      if codereview_issue_number is None:
+        return
+
+      self.SetCodeReviewIssueNumber(branch_name, codereview_issue_number)
+      review_file.Remove()
+
+    return codereview_issue_number
+
+  def HasBranch(self, branch_name):
+    """Determines if the index contains a review of a feature branch.
+
+    Args:
+      branch_name (str): name of the feature branch of the review.
+
+    Returns:
+      bool: True if the index contains a review of the feature branch.
+    """
+    if branch_name in self._codereview_issue_numbers:
+      return True
+
+    return self._GetReviewFile(branch_name) is not None
+
+  def RemoveBranch(self, branch_name):
+    """Removes the review of a feature branch.
+
+    Args:
+      branch_name (str): name of the feature branch of the review.
+    """
+    if branch_name in self._codereview_issue_numbers:
+      del self._codereview_issue_numbers[branch_name]
+      self._WriteIndex()
+
+    review_file = self._GetReviewFile(branch_name)
+    if review_file:
+      review_file.Remove()
+
+  def SetCodeReviewIssueNumber(self, branch_name, codereview_issue_number):
+    """Sets the codereview issue number of a feature branch.
+
+    Args:
+      branch_name (str): name of the feature branch of the review.
+      codereview_issue_number (int|str): codereview issue number.
+    """
+    self._codereview_issue_numbers[branch_name] = int(codereview_issue_number)
+    self._WriteIndex()
@@ -5,10 +5,30 @@
 from __future__ import print_function
 
 import argparse
-import os
 import sys
 
 from l2treviewtools.helpers.review import ReviewHelper
+from l2treviewtools.lib import netrcfile
+
+
+# Commands that have an alternative name with an underscore instead of
+# a dash.
+_COMMAND_ALIASES = {
+    u'lint_test': u'lint-test',
+    u'merge_edit': u'merge-edit',
+    u'update_authors': u'update-authors',
+    u'update_version': u'update-version'}
+
+# Review helper methods that run a command, where the commands that only lint
+# and test are completed by the checks that are run for every command.
+_COMMAND_METHODS = {
+    u'close': ReviewHelper.Close,
+    u'create': ReviewHelper.Create,
+    u'merge': ReviewHelper.Merge,
+    u'open': ReviewHelper.Open,
+    u'update': ReviewHelper.Update,
+    u'update-authors': ReviewHelper.UpdateAuthors,
+    u'update-version': ReviewHelper.UpdateVersion}
 
 
 def Main():
@@ -36,6 +56,12 @@ def Main():
           u'to indicate to what "base" the code changes are relative to and '
           u'can be used to "chain" code reviews.'))
 
+  argument_parser.add_argument(
+      u'--isolate', dest=u'isolate', action=u'store_true', default=False,
+      help=(
+          u'Run the codereview upload.py tool in a separate process instead '
+          u'of in the review script process.'))
+
   argument_parser.add_argument(
       u'--nobrowser', u'--no-browser', u'--no_browser', dest=u'no_browser',
       action=u'store_true', default=False, help=(
@@ -78,26 +104,25 @@ def Main():
       metavar=u'GITHUB_ORIGIN', default=None,
       help=u'the github origin to merged e.g. username:feature.')
 
-  merge_edit_command_parser = commands_parser.add_parser(u'merge-edit')
+  # The arguments of the merge-edit command are defined once and shared with
+  # its alias, since the aliases keyword of add_parser is not supported by
+  # Python 2.
+  merge_edit_arguments_parser = argparse.ArgumentParser(add_help=False)
 
   # TODO: add this to help output.
-  merge_edit_command_parser.add_argument(
+  merge_edit_arguments_parser.add_argument(
       u'github_origin', action=u'store',
       metavar=u'GITHUB_ORIGIN', default=None,
       help=u'the github origin to merged e.g. username:feature.')
 
-  merge_edit_command_parser = commands_parser.add_parser(u'merge_edit')
-
-  # TODO: add this to help output.
-  merge_edit_command_parser.add_argument(
-      u'github_origin', action=u'store',
-      metavar=u'GITHUB_ORIGIN', default=None,
-      help=u'the github origin to merged e.g. username:feature.')
+  for command_name in (u'merge-edit', u'merge_edit'):
+    commands_parser.add_parser(
+        command_name, parents=[merge_edit_arguments_parser])
 
   commands_parser.add_parser(u'lint')
 
-  commands_parser.add_parser(u'lint-test')
-  commands_parser.add_parser(u'lint_test')
+  for command_name in (u'lint-test', u'lint_test'):
+    commands_parser.add_parser(command_name)
 
   open_command_parser = commands_parser.add_parser(u'open')
 
@@ -122,14 +147,15 @@ def Main():
 
   commands_parser.add_parser(u'update')
 
-  commands_parser.add_parser(u'update-authors')
-  commands_parser.add_parser(u'update_authors')
-
-  commands_parser.add_parser(u'update-version')
-  commands_parser.add_parser(u'update_version')
+  for command_name in (
+      u'update-authors', u'update_authors', u'update-version',
+      u'update_version'):
+    commands_parser.add_parser(command_name)
 
   options = argument_parser.parse_args()
 
+  options.command = _COMMAND_ALIASES.get(options.command, options.command)
+
   codereview_issue_number = None
   feature_branch = None
   github_origin = None
@@ -137,21 +163,22 @@ def Main():
   print_help_on_error = False
   if options.command in (u'close', u'open'):
     feature_branch = getattr(options, u'branch', None)
+
+    # Support "username:branch" notation.
+    if feature_branch and u':' in feature_branch:
+      _, _, feature_branch = feature_branch.rpartition(u':')
+
     if not feature_branch:
       print(u'Feature branch value is missing.')
       print_help_on_error = True
 
-      # Support "username:branch" notation.
-      if u':' in feature_branch:
-        _, _, feature_branch = feature_branch.rpartition(u':')
-
   if options.command in (u'merge', u'open'):
     codereview_issue_number = getattr(options, u'codereview_issue_number', None)
     if not codereview_issue_number:
       print(u'Codereview issue number value is missing.')
       print_help_on_error = True
 
-  if options.command in (u'merge', u'merge-edit', u'merge_edit'):
+  if options.command in (u'merge', u'merge-edit'):
     github_origin = getattr(options, u'github_origin', None)
     if not github_origin:
       print(u'Github origin value is missing.')
@@ -159,7 +186,7 @@ def Main():
 
   # yapf: disable
   if options.offline and options.command not in (
-      u'lint', u'lint-test', u'lint_test', u'test'):
+      u'lint', u'lint-test', u'test'):
     print(u'Cannot run: {0:s} in offline mode.'.format(options.command))
     print_help_on_error = True
   # yapf: enable
@@ -170,9 +197,9 @@ def Main():
     print(u'')
     return False
 
-  home_path = os.path.expanduser(u'~')
-  netrc_path = os.path.join(home_path, u'.netrc')
-  if not os.path.exists(netrc_path):
+  # The .netrc file is read once and shared with the review helper.
+  netrc_file = netrcfile.NetRCFile()
+  if not netrc_file.Exists():
     print(u'{0:s} aborted - unable to find .netrc.'.format(
         options.command.title()))  # yapf: disable
     return False
@@ -183,12 +210,19 @@ def Main():
       feature_branch,
       options.diffbase,
       all_files=options.all_files,
+      isolate=options.isolate,
+      netrc_file=netrc_file,
       no_browser=options.no_browser,
       no_confirm=options.no_confirm)
 
   if not review_helper.InitializeHelpers():
     return False
 
+  if options.command == u'merge':
+    # The information needed to prepare the merge is retrieved while
+    # the state of the git repository is checked.
+    review_helper.PrefetchMergeInformation(codereview_issue_number)
+
   if not review_helper.CheckLocalGitState():
     return False
 
@@ -199,7 +233,7 @@ def Main():
     if not review_helper.PrepareMerge(codereview_issue_number):
       return False
 
-  if options.command in (u'merge', u'merge-edit', u'merge_edit'):
+  if options.command in (u'merge', u'merge-edit'):
     if not review_helper.PullChangesFromFork():
       return False
 
@@ -209,32 +243,17 @@ def Main():
   if not review_helper.Test():
     return False
 
-  result = False
-  if options.command == u'create':
-    result = review_helper.Create()
-
-  elif options.command == u'close':
-    result = review_helper.Close()
+  if options.command in (u'lint', u'lint-test', u'test'):
+    return True
 
-  elif options.command in (u'lint', u'lint-test', u'lint_test', u'test'):
-    result = True
-
-  elif options.command == u'merge':
-    result = review_helper.Merge(codereview_issue_number)
-
-  elif options.command == u'open':
-    result = review_helper.Open(codereview_issue_number)
-
-  elif options.command == u'update':
-    result = review_helper.Update()
-
-  elif options.command in (u'update-authors', u'update_authors'):
-    result = review_helper.UpdateAuthors()
+  command_method = _COMMAND_METHODS.get(options.command, None)
+  if not command_method:
+    return False
 
-  elif options.command in (u'update-version', u'update_version'):
-    result = review_helper.UpdateVersion()
+  if options.command in (u'merge', u'open'):
+    return command_method(review_helper, codereview_issue_number)
 
-  return result
+  return command_method(review_helper)
 
 
 if __name__ == u'__main__':
@@ -24,3 +24,32 @@ class CLIHelperTest(unittest.TestCase):
     self.assertEqual(exit_code, 0)
     self.assertEqual(stdout, b'hello\n')
     self.assertEqual(stderr, b'')
+
+    exit_code, stdout, stderr = real_helper.RunCommand(
+        [u'echo', u'hello; world'])
+    self.assertEqual(exit_code, 0)
+    self.assertEqual(stdout, b'hello; world\n')
+    self.assertEqual(stderr, b'')
+
+    exit_code, stdout, stderr = test_helper.RunCommand([u'echo', u'hi'])
+    self.assertEqual(exit_code, 0)
+    self.assertEqual(stdout, b'hi\n')
+
+  def testRunCommandWithOutputCallback(self):
+    """Tests the RunCommandWithOutputCallback function."""
+    mock_responses = {u'echo hi': [0, b'hi\nthere\n', b'']}
+    test_helper = cli_helper.CLIHelper(mock_responses=mock_responses)
+
+    lines = []
+    exit_code = test_helper.RunCommandWithOutputCallback(
+        u'echo hi', lines.append)
+    self.assertEqual(exit_code, 0)
+    self.assertEqual(lines, [b'hi\n', b'there\n'])
+
+    real_helper = cli_helper.CLIHelper()
+
+    lines = []
+    exit_code = real_helper.RunCommandWithOutputCallback(
+        [u'echo', u'hello'], lines.append)
+    self.assertEqual(exit_code, 0)
+    self.assertEqual(lines, [b'hello\n'])
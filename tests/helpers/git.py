@@ -8,6 +8,43 @@ import l2treviewtools.helpers.git as git_helper
 class GitHelperTest(unittest.TestCase):
   """Tests the git helper"""
 
+  def testGetActiveBranch(self):
+    """Tests the GetActiveBranch function."""
+    helper = git_helper.GitHelper(
+        u'https://github.com/log2timeline/l2treviewtools.git')
+    helper.mock_responses = {
+        u'git branch': [0, b'  master\n* feature\n', b''],
+        u'git checkout master': [0, b'', b'']}
+
+    active_branch = helper.GetActiveBranch()
+    self.assertEqual(active_branch, b'feature')
+
+    # The active branch is cached.
+    helper.mock_responses[u'git branch'] = [0, b'* master\n  feature\n', b'']
+    active_branch = helper.GetActiveBranch()
+    self.assertEqual(active_branch, b'feature')
+
+    # Switching branches invalidates the cached active branch.
+    helper.SwitchToMasterBranch()
+    active_branch = helper.GetActiveBranch()
+    self.assertEqual(active_branch, b'master')
+
+  def testGetPorcelainStatus(self):
+    """Tests the GetPorcelainStatus function."""
+    helper = git_helper.GitHelper(
+        u'https://github.com/log2timeline/l2treviewtools.git')
+    helper.mock_responses = {u'git status --porcelain -z': [
+        0, b' M setup.py\0R  new.py\0old.py\0?? test.py\0', b'']}
+
+    changed_files = helper.GetPorcelainStatus()
+    self.assertEqual(changed_files, [
+        (b' M', b'setup.py'), (b'R ', b'new.py'), (b'??', b'test.py')])
+
+    self.assertTrue(helper.CheckHasUncommittedChanges())
+
+    helper.mock_responses = {u'git status --porcelain -z': [0, b'', b'']}
+    self.assertFalse(helper.CheckHasUncommittedChanges())
+
   def testInitialize(self):
     """Tests that the helper can be initialized."""
     helper = git_helper.GitHelper(
@@ -32,6 +32,10 @@ class GitHubHelperTest(unittest.TestCase):
     url = helper.GetForkGitRepoUrl(u'test_user')
     self.assertEqual(url, expected_url)
 
+    # The URL is cached per user name.
+    cached_url = helper.GetForkGitRepoUrl(u'test_user')
+    self.assertIs(cached_url, url)
+
   def testQueryUser(self):
     """Tests the QueryUser function."""
     helper = github.GitHubHelper(
@@ -13,3 +13,14 @@ class ProjectHelperTest(unittest.TestCase):
     helper = project_helper.ProjectHelper(
         u'/home/plaso/l2treviewtools/review.py')
     self.assertIsNotNone(helper)
+
+  def testSupportedProjectsLongestFirst(self):
+    """Tests the order of the supported project names, longest first."""
+    helper_class = project_helper.ProjectHelper
+    project_names = helper_class.SUPPORTED_PROJECTS_LONGEST_FIRST
+
+    # Project names of the same length are sorted alphabetically.
+    self.assertEqual(project_names, (
+        u'l2treviewtools', u'l2tdevtools', u'dfdatetime', u'dftimewolf',
+        u'artifacts', u'eccemotus', u'dfwinreg', u'dfkinds', u'l2tdocs',
+        u'l2tpreg', u'dfvfs', u'plaso'))
@@ -1,14 +1,145 @@
 # -*- coding: utf-8 -*-
 """Tests for the pylint helper."""
+import sys
+import types
 import unittest
 
 import l2treviewtools.helpers.pylint as pylint_helper
 
 
+# pylint: disable=protected-access
+
+class OutputWriterTest(unittest.TestCase):
+  """Tests the output writer"""
+
+  def testWrite(self):
+    """Tests the write and flush functions."""
+    lines = []
+    output_writer = pylint_helper._OutputWriter(lines.append)
+
+    output_writer.write(u'test.py:1: [C0111(missing')
+    self.assertEqual(lines, [])
+
+    output_writer.write(u'-docstring), ] Missing docstring\nother')
+    self.assertEqual(
+        lines, [b'test.py:1: [C0111(missing-docstring), ] Missing docstring\n'])
+
+    output_writer.flush()
+    self.assertEqual(lines[-1], b'other')
+
+
+class TestPylintRun(object):
+  """pylint run for testing that exits like pylint on a usage error."""
+
+  def __init__(self, unused_arguments, **unused_kwargs):
+    """Initializes a pylint run for testing.
+
+    Raises:
+      SystemExit: always, like pylint when its rcfile is missing.
+    """
+    super(TestPylintRun, self).__init__()
+    raise SystemExit(32)
+
+
+class TestTextReporter(object):
+  """pylint text reporter for testing."""
+
+  def __init__(self, output=None):
+    """Initializes a pylint text reporter for testing.
+
+    Args:
+      output (Optional[file]): output.
+    """
+    super(TestTextReporter, self).__init__()
+    self.output = output
+
+
 class PylintHelperTest(unittest.TestCase):
   """Tests the pylint helper"""
 
+  _PYLINT_MODULE_NAMES = (
+      u'pylint', u'pylint.__pkginfo__', u'pylint.lint', u'pylint.reporters',
+      u'pylint.reporters.text')
+
+  def _InstallTestPylintModules(self):
+    """Installs pylint modules for testing, since pylint could be missing."""
+    self._original_modules = {
+        name: sys.modules.get(name, None)
+        for name in self._PYLINT_MODULE_NAMES}
+
+    test_modules = {
+        name: types.ModuleType(str(name)) for name in self._PYLINT_MODULE_NAMES}
+
+    test_modules[u'pylint.__pkginfo__'].numversion = (1, 6, 5)
+    test_modules[u'pylint.lint'].Run = TestPylintRun
+    test_modules[u'pylint.reporters.text'].TextReporter = TestTextReporter
+
+    test_modules[u'pylint'].__pkginfo__ = test_modules[u'pylint.__pkginfo__']
+    test_modules[u'pylint'].lint = test_modules[u'pylint.lint']
+    test_modules[u'pylint'].reporters = test_modules[u'pylint.reporters']
+    test_modules[u'pylint.reporters'].text = test_modules[
+        u'pylint.reporters.text']
+
+    sys.modules.update(test_modules)
+
+  def _RestorePylintModules(self):
+    """Restores the pylint modules."""
+    for name, module in self._original_modules.items():
+      if module:
+        sys.modules[name] = module
+      else:
+        del sys.modules[name]
+
+  def testCheckFilesWithUsageError(self):
+    """Tests the CheckFiles function when pylint exits on a usage error."""
+    self._InstallTestPylintModules()
+    try:
+      helper = pylint_helper.PylintHelper()
+      self.assertTrue(helper._UseInProcessPylint())
+
+      exit_code = helper._RunPylintInProcess([u'test.py'])
+      self.assertEqual(exit_code, 32)
+
+      self.assertFalse(helper.CheckFiles([u'test.py']))
+
+    finally:
+      self._RestorePylintModules()
+
+  def setUp(self):
+    """Makes preparations before running an individual test."""
+    pylint_helper.PylintHelper._version_tuple = None
+
+  def tearDown(self):
+    """Cleans up after running an individual test."""
+    pylint_helper.PylintHelper._version_tuple = None
+
+  def testCheckUpToDateVersion(self):
+    """Tests the CheckUpToDateVersion function."""
+    mock_responses = {u'pylint --version': [
+        0, b'pylint 1.6.5,\nastroid 1.4.9\n', b'']}
+    helper = pylint_helper.PylintHelper(mock_responses=mock_responses)
+    self.assertTrue(helper.CheckUpToDateVersion())
+
+    # The version is cached hence pylint is not run again.
+    helper.mock_responses = {u'pylint --version': [1, b'', b'']}
+    self.assertTrue(helper.CheckUpToDateVersion())
+
+    pylint_helper.PylintHelper._version_tuple = None
+
+    mock_responses = {u'pylint --version': [
+        0, b'pylint 1.5.4,\nastroid 1.4.9\n', b'']}
+    helper = pylint_helper.PylintHelper(mock_responses=mock_responses)
+    self.assertFalse(helper.CheckUpToDateVersion())
+
   def testInitialize(self):
     """Tests that the helper can be initialized."""
     helper = pylint_helper.PylintHelper()
     self.assertIsNotNone(helper)
+
+  def testUseInProcessPylint(self):
+    """Tests the _UseInProcessPylint function."""
+    # pylint is not run in the current process when the helper is used for
+    # testing.
+    mock_responses = {u'pylint --version': [0, b'', b'']}
+    helper = pylint_helper.PylintHelper(mock_responses=mock_responses)
+    self.assertFalse(helper._UseInProcessPylint())
@@ -13,6 +13,14 @@ class ReadthedocsHelperTest(unittest.TestCase):
 
   # pylint: disable=protected-access
 
+  def setUp(self):
+    """Makes preparations before running an individual test."""
+    readthedocs.ReadTheDocsHelper._last_trigger_build_times = {}
+
+  def tearDown(self):
+    """Cleans up after running an individual test."""
+    readthedocs.ReadTheDocsHelper._last_trigger_build_times = {}
+
   def testTriggerBuild(self):
     """Tests the TriggerBuild function."""
     helper = readthedocs.ReadTheDocsHelper(project=u'test')
@@ -21,6 +29,14 @@ class ReadthedocsHelperTest(unittest.TestCase):
     result = helper.TriggerBuild()
     self.assertTrue(result)
 
+    # A repeated trigger is ignored.
+    url_lib_helper = test_lib.TestRecordingURLLibHelper()
+    helper._url_lib_helper = url_lib_helper
+
+    result = helper.TriggerBuild()
+    self.assertTrue(result)
+    self.assertEqual(url_lib_helper.urls, [])
+
 
 if __name__ == '__main__':
   unittest.main()
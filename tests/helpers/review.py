@@ -4,13 +4,95 @@ import unittest
 
 import l2treviewtools.helpers.review as review_helper
 
+from tests.helpers import test_lib
+
+
+class TestMergeHelper(object):
+  """Git, project and sphinx-apidoc helper for testing merges."""
+
+  def __init__(self, update_version_file_result=True):
+    """Initializes a merge helper for testing.
+
+    Args:
+      update_version_file_result (Optional[bool]): result that updating
+          the version file should return.
+    """
+    super(TestMergeHelper, self).__init__()
+    self._update_version_file_result = update_version_file_result
+    self.dropped_uncommitted_changes = False
+
+  def DropUncommittedChanges(self):
+    """Drops the uncommitted changes."""
+    self.dropped_uncommitted_changes = True
+
+  def UpdateAPIDocs(self):
+    """Updates the API docs.
+
+    Returns:
+      bool: True if the API docs have been updated.
+    """
+    return True
+
+  def UpdateVersionFile(self):
+    """Updates the version file.
+
+    Returns:
+      bool: True if the version file was updated.
+    """
+    return self._update_version_file_result
+
 
 class ReviewHelperTest(unittest.TestCase):
   """Tests the review helper"""
 
+  # pylint: disable=protected-access
+
   def testInitialize(self):
     """Tests that the helper can be initialized."""
     helper = review_helper.ReviewHelper(
         u'test', u'https://github.com/log2timeline/l2treviewtools.git',
         u'import', u'upstream/master')
     self.assertIsNotNone(helper)
+
+  def testInitializeHelpers(self):
+    """Tests the InitializeHelpers function."""
+    helper = review_helper.ReviewHelper(
+        u'lint', u'https://github.com/log2timeline/l2treviewtools.git',
+        u'import', u'upstream/master')
+
+    self.assertTrue(helper.InitializeHelpers())
+
+    # The response cache is not opened for commands that do not query github
+    # or codereview.
+    self.assertIsNone(helper._response_cache)
+
+  def testMergeWithFailedVersionUpdate(self):
+    """Tests the Merge function when the version file cannot be updated."""
+    helper = review_helper.ReviewHelper(
+        u'merge', u'https://github.com/log2timeline/l2treviewtools.git',
+        u'import', u'upstream/master', no_confirm=True)
+
+    merge_helper = TestMergeHelper(update_version_file_result=False)
+    url_lib_helper = test_lib.TestRecordingURLLibHelper()
+
+    helper._git_helper = merge_helper
+    helper._has_apidoc = True
+    helper._project_helper = merge_helper
+    helper._project_name = u'l2treviewtools'
+    helper._sphinxapidoc_helper = merge_helper
+    helper._url_lib_helper = url_lib_helper
+
+    self.assertFalse(helper.Merge(12345))
+    self.assertTrue(merge_helper.dropped_uncommitted_changes)
+
+    # readthedocs is not triggered for an aborted merge.
+    self.assertEqual(url_lib_helper.urls, [])
+
+  def testReadDescription(self):
+    """Tests the _ReadDescription function."""
+    helper = review_helper.ReviewHelper(
+        u'test', u'https://github.com/log2timeline/l2treviewtools.git',
+        u'import', u'upstream/master', no_confirm=True)
+
+    description = helper._ReadDescription(u'code review', u'Description')
+    self.assertEqual(description, u'Description')
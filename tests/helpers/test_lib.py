@@ -27,3 +27,40 @@ class TestURLLibHelper(object):
       ConnectionError: if the request failed.
     """
     return b''
+
+  def RequestIfModified(self, unused_url, **unused_kwargs):
+    """Sends a conditional GET request to an URL.
+
+    Args:
+      url (str): URL to send the request.
+      etag (Optional[str]): entity tag (ETag) of a previous response.
+      headers (Optional[dict[str, str]]): HTTP headers to send.
+
+    Returns:
+      tuple[str, bytes]: entity tag (ETag) and data of the response.
+
+    Raises:
+      ConnectionError: if the request failed.
+    """
+    return None, b''
+
+
+class TestRecordingURLLibHelper(TestURLLibHelper):
+  """URL library (urllib) helper for testing that records the requests."""
+
+  def __init__(self):
+    """Initializes an URL library (urllib) helper."""
+    super(TestRecordingURLLibHelper, self).__init__()
+    self.urls = []
+
+  def Request(self, url, **unused_kwargs):
+    """Sends a request to an URL.
+
+    Args:
+      url (str): URL to send the request.
+
+    Returns:
+      bytes: response data.
+    """
+    self.urls.append(url)
+    return b''
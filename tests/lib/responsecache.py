@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Tests for the response cache implementation."""
+import os
+import shutil
+import tempfile
+import unittest
+
+import l2treviewtools.lib.responsecache as responsecache_lib
+
+
+class ResponseCacheTest(unittest.TestCase):
+  """Tests the response cache implementation."""
+
+  def setUp(self):
+    """Makes preparations before running an individual test."""
+    self._temporary_directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    """Cleans up after running an individual test."""
+    shutil.rmtree(self._temporary_directory, True)
+
+  @unittest.skipIf(os.name != u'posix', u'File modes are POSIX specific.')
+  def testInitialize(self):
+    """Tests that the cache is only accessible by the user."""
+    path = os.path.join(self._temporary_directory, u'cache', u'responses.db')
+    response_cache = responsecache_lib.ResponseCache(path)
+    response_cache.Close()
+
+    directory_mode = os.stat(os.path.dirname(path)).st_mode & 0o777
+    self.assertEqual(directory_mode, 0o700)
+
+    file_mode = os.stat(path).st_mode & 0o777
+    self.assertEqual(file_mode, 0o600)
+
+  def testGetAndSetResponse(self):
+    """Tests the GetResponse, RemoveResponse and SetResponse functions."""
+    path = os.path.join(self._temporary_directory, u'cache', u'responses.db')
+    response_cache = responsecache_lib.ResponseCache(path)
+
+    cached_response = response_cache.GetResponse(u'https://example.com/1')
+    self.assertIsNone(cached_response)
+
+    response_cache.SetResponse(u'https://example.com/1', u'"etag1"', b'{}')
+    etag, body, _ = response_cache.GetResponse(u'https://example.com/1')
+    self.assertEqual(etag, u'"etag1"')
+    self.assertEqual(body, b'{}')
+
+    response_cache.SetResponse(u'https://example.com/1', u'"etag2"', b'[]')
+    etag, body, _ = response_cache.GetResponse(u'https://example.com/1')
+    self.assertEqual(etag, u'"etag2"')
+    self.assertEqual(body, b'[]')
+
+    response_cache.RemoveResponse(u'https://example.com/1')
+    cached_response = response_cache.GetResponse(u'https://example.com/1')
+    self.assertIsNone(cached_response)
+
+    response_cache.Close()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Tests for the review index implementation."""
+import os
+import shutil
+import tempfile
+import unittest
+
+import l2treviewtools.lib.reviewindex as reviewindex_lib
+
+
+class ReviewIndexTest(unittest.TestCase):
+  """Tests the review index implementation."""
+
+  def setUp(self):
+    """Makes preparations before running an individual test."""
+    self._temporary_directory = tempfile.mkdtemp()
+    self._path = os.path.join(self._temporary_directory, u'.review')
+
+  def tearDown(self):
+    """Cleans up after running an individual test."""
+    shutil.rmtree(self._temporary_directory, True)
+
+  def testSetCodeReviewIssueNumber(self):
+    """Tests the SetCodeReviewIssueNumber function."""
+    review_index = reviewindex_lib.ReviewIndex(path=self._path)
+    self.assertFalse(review_index.HasBranch(u'feature'))
+    self.assertIsNone(review_index.GetCodeReviewIssueNumber(u'feature'))
+
+    review_index.SetCodeReviewIssueNumber(u'feature', u'12345')
+
+    review_index = reviewindex_lib.ReviewIndex(path=self._path)
+    self.assertTrue(review_index.HasBranch(u'feature'))
+    self.assertEqual(review_index.GetCodeReviewIssueNumber(u'feature'), 12345)
+
+  def testRemoveBranch(self):
+    """Tests the RemoveBranch function."""
+    review_index = reviewindex_lib.ReviewIndex(path=self._path)
+    review_index.SetCodeReviewIssueNumber(u'feature', 12345)
+    review_index.RemoveBranch(u'feature')
+
+    review_index = reviewindex_lib.ReviewIndex(path=self._path)
+    self.assertFalse(review_index.HasBranch(u'feature'))
+
+  def testReviewFile(self):
+    """Tests the support for review files of individual feature branches."""
+    os.mkdir(self._path)
+    review_file_path = os.path.join(self._path, u'feature')
+    with open(review_file_path, 'w') as file_object:
+      file_object.write(u'12345')
+
+    review_index = reviewindex_lib.ReviewIndex(path=self._path)
+    self.assertTrue(review_index.HasBranch(u'feature'))
+    self.assertEqual(review_index.GetCodeReviewIssueNumber(u'feature'), 12345)
+
+    # The review file is moved into the index.
+    self.assertFalse(os.path.exists(review_file_path))
+
+    review_index = reviewindex_lib.ReviewIndex(path=self._path)
+    self.assertEqual(review_index.GetCodeReviewIssueNumber(u'feature'), 12345)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,14 +1,304 @@
 # -*- coding: utf-8 -*-
 """Tests for the upload helper."""
+import os
+import shutil
+import sys
+import tempfile
 import unittest
 
 import l2treviewtools.helpers.upload as upload_helper
+from l2treviewtools.lib import errors
+from l2treviewtools.lib import responsecache
+
+
+class TestCodeReviewURLLibHelper(object):
+  """URL library (urllib) helper that mimics codereview for testing."""
+
+  def __init__(self, rejected_xsrf_tokens=None):
+    """Initializes an URL library (urllib) helper.
+
+    Args:
+      rejected_xsrf_tokens (Optional[list[str]]): XSRF tokens that are
+          rejected when a form is posted.
+    """
+    super(TestCodeReviewURLLibHelper, self).__init__()
+    self.number_of_issue_requests = 0
+    self.number_of_xsrf_token_requests = 0
+    self.posted_forms = []
+    self._rejected_xsrf_tokens = rejected_xsrf_tokens or []
+
+  def Request(self, url, post_data=None, **unused_kwargs):
+    """Sends a request to an URL.
+
+    Args:
+      url (str): URL to send the request.
+      post_data (Optional[dict[str, str]]): form fields to send.
+
+    Returns:
+      bytes: response data.
+
+    Raises:
+      HTTPError: if the XSRF token was rejected.
+    """
+    if url.endswith(u'/xsrf_token'):
+      self.number_of_xsrf_token_requests += 1
+      return u'xsrf{0:d}'.format(self.number_of_xsrf_token_requests).encode(
+          u'utf-8')
+
+    if post_data is None:
+      self.number_of_issue_requests += 1
+      _, _, issue_number = url.rpartition(u'/')
+      return u'{{"issue": {0:s}}}'.format(issue_number).encode(u'utf-8')
+
+    if post_data[u'xsrf_token'] in self._rejected_xsrf_tokens:
+      raise errors.HTTPError(u'Forbidden', 403)
+
+    self.posted_forms.append(post_data)
+    return b''
+
+
+class TestUploadTool(object):
+  """upload.py tool for testing that replaces its RealMain function."""
+
+  def __init__(self, result=None, exception=None):
+    """Initializes an upload.py tool for testing.
+
+    Args:
+      result (Optional[tuple[str, str]]): issue number and patchset that
+          RealMain should return.
+      exception (Optional[BaseException]): exception that RealMain should
+          raise.
+    """
+    super(TestUploadTool, self).__init__()
+    self._exception = exception
+    self._result = result
+    self.argv = None
+    self.lc_all = None
+
+  def RealMain(self, argv):
+    """Runs upload.py.
+
+    Args:
+      argv (list[str]): upload.py command line arguments.
+
+    Returns:
+      tuple[str, str]: issue number and patchset.
+
+    Raises:
+      BaseException: if an exception was defined.
+    """
+    self.argv = argv
+    self.lc_all = os.environ.get(u'LC_ALL', None)
+    if self._exception:
+      raise self._exception
+
+    return self._result
 
 
 class UploadHelperTest(unittest.TestCase):
   """Tests the upload helper"""
 
+  # pylint: disable=protected-access
+
+  def setUp(self):
+    """Makes preparations before running an individual test."""
+    self._temporary_directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    """Cleans up after running an individual test."""
+    shutil.rmtree(self._temporary_directory, True)
+
+  def testCloseIssue(self):
+    """Tests the CloseIssue function."""
+    url_lib_helper = TestCodeReviewURLLibHelper(rejected_xsrf_tokens=[u'xsrf1'])
+    helper = upload_helper.UploadHelper(
+        email_address=u'onager@deerpie.com', url_lib_helper=url_lib_helper)
+    helper._access_token = u'token'
+
+    # The rejected XSRF token is replaced by a new XSRF token.
+    self.assertTrue(helper.CloseIssue(12345))
+    self.assertEqual(url_lib_helper.number_of_xsrf_token_requests, 2)
+    self.assertEqual(url_lib_helper.posted_forms, [{u'xsrf_token': u'xsrf2'}])
+
+  def testGetXSRFToken(self):
+    """Tests the GetXSRFToken function."""
+    path = os.path.join(self._temporary_directory, u'responses.db')
+    response_cache = responsecache.ResponseCache(path)
+
+    url_lib_helper = TestCodeReviewURLLibHelper()
+    helper = upload_helper.UploadHelper(
+        email_address=u'onager@deerpie.com', response_cache=response_cache,
+        url_lib_helper=url_lib_helper)
+    helper._access_token = u'token'
+
+    self.assertEqual(helper.GetXSRFToken(), u'xsrf1')
+
+    # The XSRF token is retrieved from the response cache.
+    helper = upload_helper.UploadHelper(
+        email_address=u'onager@deerpie.com', response_cache=response_cache,
+        url_lib_helper=url_lib_helper)
+    helper._access_token = u'token'
+
+    self.assertEqual(helper.GetXSRFToken(), u'xsrf1')
+    self.assertEqual(url_lib_helper.number_of_xsrf_token_requests, 1)
+
+    # The XSRF token is not reused for another access token.
+    helper = upload_helper.UploadHelper(
+        email_address=u'onager@deerpie.com', response_cache=response_cache,
+        url_lib_helper=url_lib_helper)
+    helper._access_token = u'other_token'
+
+    self.assertEqual(helper.GetXSRFToken(), u'xsrf2')
+
+    response_cache.Close()
+
+  def testGetReviewer(self):
+    """Tests the _GetReviewer function."""
+    helper = upload_helper.UploadHelper(email_address=u'onager@deerpie.com')
+
+    reviewer = helper._GetReviewer(u'dfvfs')
+    self.assertEqual(reviewer, u'joachim.metz@gmail.com')
+
+    reviewer = helper._GetReviewer(u'unknown')
+    self.assertIn(
+        reviewer, [u'jberggren@gmail.com', u'joachim.metz@gmail.com'])
+
+  def testGetReviewersOnCC(self):
+    """Tests the _GetReviewersOnCC function."""
+    helper = upload_helper.UploadHelper(email_address=u'onager@deerpie.com')
+
+    reviewers_cc = helper._GetReviewersOnCC(
+        u'dfvfs', u'joachim.metz@gmail.com')
+    self.assertEqual(
+        reviewers_cc,
+        u'kiddi@kiddaland.net,log2timeline-dev@googlegroups.com')
+
+    reviewers_cc = helper._GetReviewersOnCC(
+        u'unknown', u'joachim.metz@gmail.com')
+    self.assertEqual(reviewers_cc, (
+        u'jberggren@gmail.com,kiddi@kiddaland.net,'
+        u'log2timeline-dev@googlegroups.com'))
+
   def testInitialize(self):
     """Tests that the helper can be initialized."""
     helper = upload_helper.UploadHelper(email_address=u'onager@deerpie.com')
     self.assertIsNotNone(helper)
+
+  def testQueryIssue(self):
+    """Tests the QueryIssue function."""
+    url_lib_helper = TestCodeReviewURLLibHelper()
+    helper = upload_helper.UploadHelper(
+        email_address=u'onager@deerpie.com', url_lib_helper=url_lib_helper)
+
+    issue_information = helper.QueryIssue(12345)
+    self.assertEqual(issue_information, {u'issue': 12345})
+
+    # The issue information is only retrieved once.
+    issue_information = helper.QueryIssue(u'12345')
+    self.assertEqual(issue_information, {u'issue': 12345})
+    self.assertEqual(url_lib_helper.number_of_issue_requests, 1)
+
+  def _RunUploadToolInProcess(self, test_upload_tool, lc_all):
+    """Runs the upload.py tool in process with a test RealMain function.
+
+    Args:
+      test_upload_tool (TestUploadTool): upload.py tool for testing.
+      lc_all (str): value of LC_ALL before running upload.py or None if
+          LC_ALL should not be set.
+
+    Returns:
+      str: codereview issue number or None if the upload failed.
+    """
+    helper = upload_helper.UploadHelper(email_address=u'onager@deerpie.com')
+
+    original_lc_all = os.environ.get(u'LC_ALL', None)
+    original_real_main = upload_helper.upload_tool.RealMain
+    upload_helper.upload_tool.RealMain = test_upload_tool.RealMain
+    try:
+      if lc_all is None:
+        os.environ.pop(u'LC_ALL', None)
+      else:
+        os.environ[u'LC_ALL'] = lc_all
+
+      issue_number = helper._RunUploadToolInProcess(
+          [helper._upload_py_path, u'--oauth2', u'-i', u'12345'])
+
+      # LC_ALL is set while upload.py runs and restored afterwards.
+      self.assertEqual(test_upload_tool.lc_all, u'C')
+      self.assertEqual(os.environ.get(u'LC_ALL', None), lc_all)
+
+    finally:
+      upload_helper.upload_tool.RealMain = original_real_main
+      if original_lc_all is None:
+        os.environ.pop(u'LC_ALL', None)
+      else:
+        os.environ[u'LC_ALL'] = original_lc_all
+
+    self.assertEqual(
+        test_upload_tool.argv,
+        [helper._upload_py_path, u'--oauth2', u'-i', u'12345'])
+
+    return issue_number
+
+  def testRunUploadToolInProcess(self):
+    """Tests the _RunUploadToolInProcess function."""
+    for lc_all in (None, u'en_US.UTF-8'):
+      test_upload_tool = TestUploadTool(result=(u'12345', u'1'))
+      issue_number = self._RunUploadToolInProcess(test_upload_tool, lc_all)
+      self.assertEqual(issue_number, u'12345')
+
+      # upload.py exits on errors, for example on invalid arguments.
+      test_upload_tool = TestUploadTool(exception=SystemExit(2))
+      issue_number = self._RunUploadToolInProcess(test_upload_tool, lc_all)
+      self.assertIsNone(issue_number)
+
+      test_upload_tool = TestUploadTool(exception=SystemExit(0))
+      issue_number = self._RunUploadToolInProcess(test_upload_tool, lc_all)
+      self.assertIsNone(issue_number)
+
+      # upload.py raises exceptions, for example when a request fails.
+      test_upload_tool = TestUploadTool(exception=IOError(u'Request failed'))
+      issue_number = self._RunUploadToolInProcess(test_upload_tool, lc_all)
+      self.assertIsNone(issue_number)
+
+  def testUpdateIssue(self):
+    """Tests the UpdateIssue function."""
+    helper = upload_helper.UploadHelper(
+        email_address=u'onager@deerpie.com', isolate=True)
+
+    # The description is passed as a single argument, without quotes.
+    command = u' '.join([
+        sys.executable, helper._upload_py_path, u'--oauth2', u'-i', u'12345',
+        u'-m', u'Code updated.', u'-t', u'Fixed "quoted" description', u'-y',
+        u'--', u'upstream/master'])
+    output = b'Issue updated. URL: http://codereview.appspot.com/12345\n'
+    helper.mock_responses = {command: [0, output, b'']}
+
+    result = helper.UpdateIssue(
+        12345, u'upstream/master', u'Fixed "quoted" description')
+    self.assertTrue(result)
+
+  def testUpdateIssueInProcess(self):
+    """Tests the UpdateIssue function with upload.py run in process."""
+    helper = upload_helper.UploadHelper(email_address=u'onager@deerpie.com')
+    test_upload_tool = TestUploadTool(result=(u'12345', u'2'))
+
+    original_real_main = upload_helper.upload_tool.RealMain
+    upload_helper.upload_tool.RealMain = test_upload_tool.RealMain
+    try:
+      result = helper.UpdateIssue(
+          12345, u'upstream/master', u'Fixed "quoted" description')
+    finally:
+      upload_helper.upload_tool.RealMain = original_real_main
+
+    self.assertTrue(result)
+
+    # The description is passed as a single argument, without quotes.
+    self.assertEqual(test_upload_tool.argv, [
+        helper._upload_py_path, u'--oauth2', u'-i', u'12345', u'-m',
+        u'Code updated.', u'-t', u'Fixed "quoted" description', u'-y', u'--',
+        u'upstream/master'])
+
+
+if __name__ == '__main__':
+  unittest.main()